@@ -0,0 +1,12 @@
+# Animator benchmarks
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from toolbox import *
+
+
+def bench_value_at_frame(benchmark, long_timeline):
+    frames = range(int(long_timeline.start_frame), int(long_timeline.stop_frame), 7)
+    benchmark(lambda: [long_timeline.value_at_frame(f) for f in frames])
@@ -0,0 +1,25 @@
+# datautils benchmarks
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from toolbox import *
+
+
+def bench_get_dates_from_text(benchmark, date_lines):
+    def run():
+        clear_date_cache()
+        return get_dates_from_text(date_lines)
+
+    benchmark(run)
+
+
+def bench_get_dates_from_text_cached(benchmark, date_lines):
+    get_dates_from_text(date_lines)
+    benchmark(get_dates_from_text, date_lines)
+
+
+def bench_colour_names_from_array(benchmark):
+    colours = np.random.default_rng(1234).integers(0, 255, (10000, 3))
+    benchmark(colour_names_from_array, colours)
@@ -0,0 +1,22 @@
+# FileOps benchmarks on a synthetic folder tree
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from toolbox import *
+
+
+def bench_get_file_list(benchmark, file_tree):
+    fs = FileOps()
+    benchmark(fs.get_file_list, file_tree, recursive=True)
+
+
+def bench_print_dir_summary(benchmark, file_tree, capsys):
+    fs = FileOps()
+    benchmark(fs.print_dir_summary, file_tree)
+
+
+def bench_print_file_summary(benchmark, file_tree, capsys):
+    fs = FileOps()
+    benchmark(fs.print_file_summary, file_tree, recursive=True)
@@ -0,0 +1,28 @@
+# ImageMixin benchmarks on 4K images
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from toolbox import *
+
+
+def bench_hsv_image(benchmark, image_4k):
+    benchmark(ImageMixin.hsv_image, image_4k)
+
+
+def bench_brightness_range(benchmark, image_4k):
+    hsv = ImageMixin.hsv_image(image_4k)
+    benchmark(ImageMixin.brightness_range, hsv)
+
+
+def bench_pad_image(benchmark, image_4k):
+    benchmark(ImageMixin.pad_image, image_4k, 64)
+
+
+def bench_crop_to_content(benchmark, image_4k):
+    benchmark(ImageMixin.crop_to_content, image_4k)
+
+
+def bench_hue_threshold_image(benchmark, image_4k):
+    benchmark(ImageMixin.hue_threshold_image, image_4k, 60, 20, 50, 50, 64)
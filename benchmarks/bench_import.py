@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+#
+# Import time and memory benchmark for the toolbox package
+#
+# Each measurement is made in a fresh interpreter so that module caching
+# does not hide the cost of an import. Since importing any submodule runs
+# the package __init__ which already imports objparams, imageutils and the
+# geometry modules, the self and cumulative times reported by -X importtime
+# are recorded for every module as well as the wall time on top of its
+# parent package. The fastest of several interleaved rounds is kept and
+# times are compared against a stored baseline (import_baseline.json)
+# after scaling it by a standard library calibration import, so that only
+# regressions and not a slower machine are reported.
+#
+#   python benchmarks/bench_import.py            compare with the baseline
+#   python benchmarks/bench_import.py --save     store a new baseline
+#
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_FILE = os.path.join(BENCH_DIR, "import_baseline.json")
+
+# toolbox modules timed individually in a fresh interpreter
+SUBMODULES = (
+    "toolbox",
+    "toolbox.constants",
+    "toolbox.objparams",
+    "toolbox.datautils",
+    "toolbox.imageutils",
+    "toolbox.niceprint",
+    "toolbox.files",
+    "toolbox.textproc",
+    "toolbox.geometry.rect",
+    "toolbox.geometry.layout",
+    "toolbox.geometry.animators",
+)
+# heavy third party dependencies
+DEPENDENCIES = ("cv2", "numpy", "nltk", "dateparser", "metayaml", "yaml", "crayons")
+# standard library modules imported to calibrate for the speed of the machine
+CALIBRATION = "decimal,http.client,unittest,xml.dom.minidom,argparse"
+# modules whose memory footprint is measured
+TABLES = ("toolbox.constants", "toolbox.datautils")
+
+# minimum absolute changes before a relative change is considered a regression
+MIN_TIME_MS = 2.0
+MIN_MEMORY_KB = 128
+
+PROBE = r"""
+import json, os, sys, time, tracemalloc
+
+def rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+name, mode = sys.argv[1], sys.argv[2]
+if mode == "calibrate":
+    t0 = time.perf_counter()
+    for module in name.split(","):
+        __import__(module)
+    print(json.dumps({"time": (time.perf_counter() - t0) * 1000}))
+    sys.exit()
+# the wall time is the contribution of a submodule on top of its package,
+# __import__ is used since -X importtime does not report importlib imports
+if "." in name:
+    __import__(name.rsplit(".", 1)[0])
+if mode == "memory":
+    rss = rss_kb()
+    tracemalloc.start()
+    __import__(name)
+    traced = tracemalloc.get_traced_memory()[0] // 1024
+    tracemalloc.stop()
+    print(json.dumps({"rss": rss_kb() - rss, "traced": traced}))
+else:
+    t0 = time.perf_counter()
+    __import__(name)
+    elapsed = (time.perf_counter() - t0) * 1000
+    loaded = [
+        m for m in json.loads(sys.argv[3])
+        if type(sys.modules.get(m)).__name__ == "module"
+    ]
+    print(json.dumps({"time": elapsed, "loaded": loaded}))
+"""
+
+
+def run_probe(name, mode, importtime=False):
+    """Imports a module in a fresh interpreter and returns the probe results
+    and, optionally, the per-module (self, cumulative) import times in ms."""
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", PROBE, name, mode, json.dumps(DEPENDENCIES)]
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in (ROOT_DIR, env.get("PYTHONPATH")) if p
+    )
+    res = subprocess.run(cmd, capture_output=True, text=True, cwd=ROOT_DIR, env=env)
+    if res.returncode != 0:
+        raise RuntimeError("import of %s failed:\n%s" % (name, res.stderr))
+    result = json.loads(res.stdout.strip().splitlines()[-1])
+    if not importtime:
+        return result, {}
+    times = {}
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        times[fields[2].strip()] = (int(fields[0]) / 1000, int(fields[1]) / 1000)
+    return result, times
+
+
+def fastest_ms(values):
+    # the fastest run is the least disturbed by other load on the machine
+    return round(min(values), 2)
+
+
+def measure(repeat=5):
+    """Runs all of the import benchmarks and returns a results dictionary."""
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "calibration_ms": None,
+        "import_ms": {},
+        "breakdown_ms": {},
+        "dependency_ms": {},
+        "loaded_by_toolbox": [],
+        "memory_kb": {},
+    }
+    # every module is probed once per round so that a slow period on a busy
+    # machine affects one sample of each module rather than all of one module
+    runs = {name: [] for name in SUBMODULES + DEPENDENCIES}
+    missing = set()
+    calibration = []
+    for _ in range(repeat):
+        calibration.append(run_probe(CALIBRATION, "calibrate")[0]["time"])
+        for name in runs:
+            if name in missing:
+                continue
+            try:
+                runs[name].append(run_probe(name, "time", importtime=True))
+            except RuntimeError:
+                if name in SUBMODULES:
+                    raise
+                missing.add(name)
+    results["calibration_ms"] = fastest_ms(calibration)
+    for name in SUBMODULES:
+        times = [t.get(name, (0.0, 0.0)) for _, t in runs[name]]
+        results["import_ms"][name] = {
+            "wall": fastest_ms(r["time"] for r, _ in runs[name]),
+            "self": fastest_ms(t[0] for t in times),
+            "cumulative": fastest_ms(t[1] for t in times),
+        }
+    # cumulative time of every module loaded by import toolbox
+    results["loaded_by_toolbox"] = runs["toolbox"][0][0]["loaded"]
+    modules = set().union(*(t for _, t in runs["toolbox"]))
+    results["breakdown_ms"] = {
+        k: fastest_ms(t.get(k, (0.0, 0.0))[1] for _, t in runs["toolbox"])
+        for k in sorted(modules)
+        if k.startswith("toolbox") or k in DEPENDENCIES
+    }
+    for name in DEPENDENCIES:
+        if name not in missing:
+            results["dependency_ms"][name] = fastest_ms(
+                r["time"] for r, _ in runs[name]
+            )
+    for name in TABLES:
+        rss = [run_probe(name, "memory")[0] for _ in range(repeat)]
+        results["memory_kb"][name] = {
+            "rss": int(statistics.median(r["rss"] for r in rss)),
+            "traced": int(statistics.median(r["traced"] for r in rss)),
+        }
+    return results
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Returns a list of regression descriptions of results against a baseline.
+    Times are compared after scaling the baseline by the ratio of the
+    calibration import times so that a slower or busier machine is not
+    reported as a regression."""
+    regressions = []
+    if not baseline:
+        return regressions
+    scale = machine_scale(results, baseline)
+
+    def check(label, new, old, min_delta, units):
+        if old is None:
+            return
+        if units == "ms":
+            old *= scale
+        if new > old * (1 + tolerance) and new - old > min_delta:
+            regressions.append(
+                "%s: %.1f %s -> %.1f %s (+%.0f%%)"
+                % (label, old, units, new, units, 100 * (new - old) / max(old, 1e-9))
+            )
+
+    for name, times in results["import_ms"].items():
+        old = baseline.get("import_ms", {}).get(name, {})
+        for k in ("wall", "self", "cumulative"):
+            check("%s %s" % (name, k), times[k], old.get(k), MIN_TIME_MS, "ms")
+    for group in ("breakdown_ms", "dependency_ms"):
+        label = "import toolbox: %s" if group == "breakdown_ms" else "%s"
+        for name, ms in results[group].items():
+            old = baseline.get(group, {}).get(name)
+            check(label % (name), ms, old, MIN_TIME_MS, "ms")
+    for name, mem in results["memory_kb"].items():
+        old = baseline.get("memory_kb", {}).get(name, {})
+        for k in ("rss", "traced"):
+            check("%s %s" % (name, k), mem[k], old.get(k), MIN_MEMORY_KB, "kB")
+    loaded = set(results["loaded_by_toolbox"]) - set(
+        baseline.get("loaded_by_toolbox", [])
+    )
+    for name in sorted(loaded):
+        regressions.append("import toolbox now loads %s" % (name))
+    return regressions
+
+
+def machine_scale(results, baseline):
+    """Returns how much slower the machine is than when the baseline was taken."""
+    new, old = results.get("calibration_ms"), baseline.get("calibration_ms")
+    return new / old if new and old else 1.0
+
+
+def print_results(results, baseline=None):
+    baseline = baseline or {}
+
+    def row(label, value, old, units):
+        s = "  %-38s %10.1f %s" % (label, value, units)
+        if old is not None:
+            s += "   (baseline %.1f %s)" % (old, units)
+        print(s)
+
+    row("Calibration", results["calibration_ms"], baseline.get("calibration_ms"), "ms")
+    print("Import time (fresh interpreter, fastest run):")
+    for name, times in results["import_ms"].items():
+        old = baseline.get("import_ms", {}).get(name, {})
+        for k in ("wall", "self", "cumulative"):
+            row("%s %s" % (name, k), times[k], old.get(k), "ms")
+    print("Cumulative import time of modules loaded by import toolbox:")
+    for name, ms in results["breakdown_ms"].items():
+        row(name, ms, baseline.get("breakdown_ms", {}).get(name), "ms")
+    print("Dependency import time:")
+    for name, ms in results["dependency_ms"].items():
+        row(name, ms, baseline.get("dependency_ms", {}).get(name), "ms")
+    print("Memory:")
+    for name, mem in results["memory_kb"].items():
+        old = baseline.get("memory_kb", {}).get(name, {})
+        row(name + " rss", mem["rss"], old.get("rss"), "kB")
+        row(name + " traced", mem["traced"], old.get("traced"), "kB")
+    print(
+        "Dependencies loaded by import toolbox: %s"
+        % (", ".join(results["loaded_by_toolbox"]) or "none")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark toolbox import time and memory against a stored baseline",
+    )
+    parser.add_argument("-n", "--repeat", type=int, default=5)
+    parser.add_argument("-s", "--save", action="store_true", default=False)
+    parser.add_argument("-b", "--baseline", type=str, default=BASELINE_FILE)
+    parser.add_argument("-t", "--tolerance", type=float, default=0.25)
+    parser.add_argument("-o", "--output", type=str, default=None)
+    args = parser.parse_args()
+
+    results = measure(repeat=args.repeat)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print_results(results)
+        print("Saved baseline to %s" % (args.baseline))
+        return 0
+
+    baseline = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    regressions = compare(results, baseline, tolerance=args.tolerance)
+    if regressions:
+        print("Regressions against baseline:")
+        for r in regressions:
+            print("  %s" % (r))
+        return 1
+    print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+# RectLayout benchmarks
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from toolbox import *
+from conftest import random_rects, layout_bounds
+
+LAYOUT_CASES = [
+    (10, "none"),
+    (10, "reshape"),
+    (10, "resize"),
+    (100, "none"),
+    (100, "reshape"),
+    (100, "resize"),
+    (1000, "none"),
+    (1000, "resize"),
+]
+
+
+@pytest.mark.parametrize("n, strategy", LAYOUT_CASES)
+def bench_optimize_layout(benchmark, n, strategy):
+    rects = random_rects(n)
+    bounds = layout_bounds(n)
+
+    def run():
+        layout = RectLayout(rects)
+        layout.optimize_layout(bounds=bounds, strategy=strategy)
+        return layout
+
+    if n > 100:
+        benchmark.pedantic(run, rounds=3, iterations=1)
+    else:
+        benchmark(run)
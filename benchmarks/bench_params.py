@@ -0,0 +1,16 @@
+# Params benchmarks
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from toolbox import *
+
+
+def bench_params_yml(benchmark, params_yml):
+    benchmark(Params, yml=params_yml)
+
+
+def bench_params_obj(benchmark, params_yml):
+    obj = dict(Params(yml=params_yml, baseunit=None))
+    benchmark(Params, obj=obj)
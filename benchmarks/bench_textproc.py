@@ -0,0 +1,35 @@
+# TextProc benchmarks
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from toolbox import *
+from toolbox.textproc import TEXTPROC_FEATURES
+
+# features are computed on first access so construction alone does no work,
+# this is a typical set read from every document
+INIT_FEATURES = ("words", "numbers", "email_address")
+
+
+def bench_textproc_init(benchmark, document_text):
+    benchmark(TextProc, document_text, features=INIT_FEATURES)
+
+
+def bench_textproc_all_features(benchmark, document_text):
+    def run():
+        tp = TextProc(document_text)
+        for feature in TEXTPROC_FEATURES:
+            getattr(tp, feature)
+        return tp
+
+    benchmark(run)
+
+
+def bench_textproc_get_dates(benchmark, document_text):
+    benchmark(lambda: TextProc(document_text).get_dates())
+
+
+def bench_textproc_stream(benchmark, document_text):
+    lines = document_text.splitlines()
+    benchmark(lambda: TextProcStream(lines).stats())
@@ -0,0 +1,127 @@
+# Generated fixtures for the pytest-benchmark performance suite
+#
+# All fixtures are generated from a fixed random seed so that results are
+# comparable between runs and releases.
+
+import random
+
+import numpy as np
+import pytest
+
+from toolbox import *
+
+SEED = 1234
+
+WORDS = (
+    "invoice receipt total amount paid order account customer shipping "
+    "subtotal tax balance payment service delivery product quantity price "
+    "reference number item description discount store purchase thank you"
+).split()
+MONTHS = "Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split()
+
+
+def random_date(rnd):
+    y, m, d = rnd.randint(2000, 2023), rnd.randint(1, 12), rnd.randint(1, 28)
+    return rnd.choice(
+        (
+            "%04d-%02d-%02d" % (y, m, d),
+            "%02d/%02d/%04d" % (m, d, y),
+            "%d %s %d" % (d, MONTHS[m - 1], y),
+            "%s %d, %d" % (MONTHS[m - 1], d, y),
+        )
+    )
+
+
+def random_line(rnd):
+    words = rnd.choices(WORDS, k=rnd.randint(3, 10))
+    extra = rnd.random()
+    if extra < 0.15:
+        words.append(random_date(rnd))
+    elif extra < 0.3:
+        words.append("$%d.%02d" % (rnd.randint(1, 999), rnd.randint(0, 99)))
+    elif extra < 0.35:
+        words.append("%s@example.com" % (rnd.choice(WORDS)))
+    elif extra < 0.4:
+        words.append("(416) 555-%04d" % (rnd.randint(0, 9999)))
+    return " ".join(w.capitalize() if rnd.random() < 0.2 else w for w in words)
+
+
+def random_rects(n, seed=SEED):
+    rnd = random.Random(seed)
+    return [RectCell(rnd.uniform(0.5, 3.0), rnd.uniform(0.5, 2.0)) for _ in range(n)]
+
+
+def layout_bounds(n):
+    bounds = Rect(3 * n**0.5, 2 * n**0.5)
+    bounds.move_top_left_to((0, 0))
+    return bounds
+
+
+@pytest.fixture(scope="session")
+def document_text():
+    """A receipt-like document of 200 lines"""
+    rnd = random.Random(SEED)
+    return "\n".join(random_line(rnd) for _ in range(200))
+
+
+@pytest.fixture(scope="session")
+def date_lines():
+    """1000 short lines, a third of which are dates"""
+    rnd = random.Random(SEED)
+    return [random_date(rnd) if i % 3 == 0 else random_line(rnd) for i in range(1000)]
+
+
+@pytest.fixture(scope="session")
+def long_timeline():
+    """An animator group of 1000 concatenated animators"""
+    rnd = random.Random(SEED)
+    kinds = (LinearAnimator, EaseInAnimator, EaseOutAnimator, EaseInOutAnimator)
+    animators = [
+        rnd.choice(kinds)(0, rnd.uniform(-10, 10), rnd.randint(10, 120), 0)
+        for _ in range(1000)
+    ]
+    return AnimatorGroup(0, animators)
+
+
+@pytest.fixture(scope="session")
+def image_4k():
+    """A 3840x2160 BGR image with a centred block of noise on a flat background"""
+    rng = np.random.default_rng(SEED)
+    img = np.full((2160, 3840, 3), 240, dtype=np.uint8)
+    img[540:1620, 960:2880] = rng.integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+    return img
+
+
+@pytest.fixture(scope="session")
+def file_tree(tmp_path_factory):
+    """A synthetic folder tree of 20 sub-folders with 25 files each"""
+    rnd = random.Random(SEED)
+    root = tmp_path_factory.mktemp("tree")
+    exts = ("jpg", "png", "txt", "pdf", "py", "mp3", "zip", "csv", "step", "")
+    for d in range(20):
+        folder = root / ("folder%02d" % (d))
+        folder.mkdir()
+        for f in range(25):
+            ext = rnd.choice(exts)
+            name = "file%03d.%s" % (f, ext) if ext else "file%03d" % (f)
+            with open(folder / name, "wb") as fp:
+                fp.write(b"x" * rnd.randint(0, 20000))
+    return str(root)
+
+
+@pytest.fixture(scope="session")
+def params_yml(tmp_path_factory):
+    """A parameter YAML file of 200 groups with 20 dimensional values each"""
+    rnd = random.Random(SEED)
+    units = ("mm", "in", "inch", "pt", "studs", "%")
+    lines = ["pitch: 8.0", ""]
+    for g in range(200):
+        lines.append("group%03d:" % (g))
+        for k in range(20):
+            value = "'%.2f %s'" % (rnd.uniform(0, 100), rnd.choice(units))
+            lines.append("    value%02d: %s" % (k, value))
+        lines.append("    offset: ${pitch}")
+    fn = tmp_path_factory.mktemp("params") / "params.yml"
+    with open(fn, "w") as fp:
+        fp.write("\n".join(lines) + "\n")
+    return str(fn)
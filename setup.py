@@ -65,6 +65,9 @@ setuptools.setup(
         'crayons',
         'pytest-cov',
     ],
+    extras_require={
+        'bench': ['pytest-benchmark'],
+    },
     scripts=['toolbox/scripts/foldercheck.py', 'toolbox/scripts/tidyfolder.py'],
     # entry_points = {
     #         'scripts': [ 'foldercheck=scripts:foldercheck.py',                  
@@ -1,5 +1,13 @@
+import subprocess
+import sys
+from types import SimpleNamespace
+
 # my modules
 from toolbox import *
+import toolbox.datautils
+
+ONE_DAY = datetime.timedelta(days=1)
+ONE_HOUR = datetime.timedelta(hours=1)
 
 
 def test_str_constraint():
@@ -180,6 +188,22 @@ def test_parse_value():
     assert z == "could"
 
 
+def test_value_template():
+    vt = ValueTemplate("Total: %v")
+    assert abs(vt.search(value_text) - 74.82) < 1e-6
+    vt = ValueTemplate("%t %v")
+    x = vt.findall(value_text)
+    assert len(x) == 4
+    assert x[0] == ["totalled:", 34.52]
+    assert x[1] == ["Taxes:", 10.0]
+    assert x[-1] == ["Pays:", 16.32]
+    assert vt.search(value_text, last=True) == 34.52
+    vt = ValueTemplate("$")
+    assert vt.findall("cost $3.50 [$4] or $ 5") == [[3.5], [4.0]]
+    assert vt.search("cost $3.50 [$4] or $ 5", max_value=3) is None
+    assert value_template("Pays: %v %*") is value_template("Pays: %v %*")
+
+
 email_text = """
 this is placeholder text which may or may not contain
 email addresses such as michael.gale@me.com or info@abc.com
@@ -253,6 +277,16 @@ def test_get_numbers():
     assert "613" in x
     assert "204-293-293" in x
     assert "876-200-S0AP" not in x
+    words = ["613", "-", "...", "1.5", "-2", "abc", "K7L", "2022-10-09"]
+    assert is_number("-2")
+    assert not is_number("..")
+    mask = numbers_mask(words)
+    assert len(mask) == len(words)
+    assert mask.sum() == 4
+    assert list(mask[:4]) == [True, False, False, True]
+    mask = has_numbers_mask(words)
+    assert mask.sum() == 6
+    assert not mask[2]
 
 
 def test_prov_state_lookup():
@@ -299,6 +333,19 @@ def test_country_lookup():
     s2 = replace_country_codes(s1)
     assert s2 == "blah blah Canada blah Germany"
 
+    s1 = "Korea, Republic of and (New Zealand) not Canadian or CAT"
+    s2 = replace_country_names(s1)
+    assert s2 == "KR and (NZ) not Canadian or CAT"
+    s2 = replace_country_codes(s1)
+    assert s2 == s1
+
+    s1 = "from United States Minor Outlying Islands to United States"
+    spans = find_country_names(s1)
+    assert len(spans) == 2
+    assert spans[0] == (5, 41, "United States Minor Outlying Islands", "UM")
+    assert spans[1][2:] == ("United States", "US")
+    assert s1[spans[1][0] : spans[1][1]] == "United States"
+
 
 def almost_same(x, y):
     if any([abs(x[i] - y[i]) > 2e-3 for i in range(3)]):
@@ -327,6 +374,11 @@ def test_colours():
     assert c2 == "firebrick3"
     c2 = colour_name_from_tuple((202, 38, 37))
     assert c2 == "firebrick3"
+    names = colour_names_from_array([(165, 42, 42), (46, 46, 46), (202, 38, 37)])
+    assert names == ["brown", "gray18", "firebrick3"]
+    names = colour_names_from_array(np.zeros((2000, 3)))
+    assert len(names) == 2000
+    assert names[-1] == colour_name_from_tuple((0, 0, 0))
 
     cs = safe_colour_tuple("#808080")
     assert almost_same(cs, (0.5, 0.5, 0.5))
@@ -366,6 +418,63 @@ def test_colours():
     assert rgb_to_hsv(4) == (3, 244, 201)
 
 
+def test_colour_arrays():
+    colours = [(255, 0, 0), (0.5, 0.5, 0.5), "#00FF00", "gray18", 15, 4]
+    hsv = rgb_to_hsv_array(colours)
+    assert hsv.shape == (6, 3)
+    assert [tuple(c) for c in hsv] == [rgb_to_hsv(c) for c in colours]
+    rgb = hsv_to_rgb_array(hsv)
+    assert [tuple(c) for c in rgb] == [hsv_to_rgb(c) for c in hsv]
+    cs = safe_colour_array(colours, as_float=False)
+    assert [tuple(c) for c in cs] == [safe_colour_tuple(c, False) for c in colours]
+    cs = safe_colour_array(np.array([(128, 128, 128), (0.5, 0.5, 0.5)]))
+    assert np.allclose(cs, [(128 / 255, 128 / 255, 128 / 255), (0.5, 0.5, 0.5)])
+    hexcodes = rgb_to_hex_array([(0, 128, 64), (0.5, 0, 1.0)])
+    assert hexcodes == ["#008040", "#7F00FF"]
+    c = rgb_from_hex_array(["#008040", "#7F00FF", "#008040"], as_uint8=True)
+    assert c.tolist() == [[0, 128, 64], [127, 0, 255], [0, 128, 64]]
+
+
+def test_ldraw_palette():
+    p = ldraw_palette()
+    assert 4 in p
+    assert 9999 not in p
+    assert p.colour(71, as_float=False) == safe_colour_tuple(71, as_float=False)
+    assert p.colour(15) == (1.0, 1.0, 1.0)
+    codes = np.array([4, 15, 9999, -1, 4])
+    rgb = p.rgb_from_codes(codes, as_float=False)
+    assert rgb.tolist() == [
+        [201, 26, 9],
+        [255, 255, 255],
+        [0, 0, 0],
+        [0, 0, 0],
+        [201, 26, 9],
+    ]
+    hsv = p.hsv_from_codes([15, 4])
+    assert [tuple(c) for c in hsv] == [rgb_to_hsv(15), rgb_to_hsv(4)]
+    assert p.nearest_code((200, 20, 10)) == 4
+    assert p.nearest_code("#FFFFFF") == 15
+    assert p.nearest_codes([(201, 26, 9), (255, 255, 255)]).tolist() == [4, 15]
+
+    # the HSV table and colour index are only built when needed
+    p2 = LDrawPalette()
+    assert p2.rgb_from_codes([4, 15]).shape == (2, 3)
+    assert "hsv" not in p2.__dict__ and "index" not in p2.__dict__
+    assert p2.hsv_from_codes([4]).tolist() == [list(rgb_to_hsv(4))]
+
+
+def test_ldraw_colour_lazy():
+    # a single LDraw colour lookup does not import numpy or OpenCV
+    code = (
+        "import sys; from toolbox import safe_colour_tuple; "
+        "print(safe_colour_tuple(4, as_float=False)); "
+        "print([m for m in ('numpy.linalg', 'cv2.version') if m in sys.modules])"
+    )
+    res = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert res.returncode == 0
+    assert res.stdout.split("\n")[:2] == ["(201, 26, 9)", "[]"]
+
+
 def test_clamp():
     x = clamp_value(3, 1, 5)
     assert x == 3
@@ -403,6 +512,14 @@ def test_eng_units():
     rs = ["800.0ns", "1.2us", "-3.0s", "2.5s", "11.239s", "150.0ks", "2.2Ms", "80.0Gs"]
     for v, vr in zip(r, rs):
         assert v == vr
+    vals = [800e-9, 1.2e-6, -3, 2.5, 11.239, 150e3, 2.2e6, 80e9]
+    r = eng_units_array(vals, units="s", unitsep=False)
+    assert list(r) == rs
+    r = eng_units_array(np.array(vals + [0, 1000]), units="B", unitary=True, sigfigs=4)
+    assert list(r) == [eng_units(x, "B", sigfigs=4, unitary=True) for x in vals] + [
+        "",
+        "1000 B",
+    ]
 
 
 def test_month_day_num():
@@ -425,17 +542,33 @@ def test_clean_filename():
         "a;ks*fjhsl-3.pdf",
         "File = 3/9;.doc",
         "-=abs=-93.zip",
+        "My File -- v2 ; final  .pdf",
     ]
     clean = [
         "a_ks_fjhsl-3.pdf",
         "File_=_3_9.doc",
         "-=abs=-93.zip",
+        "My_File--v2_final.pdf",
     ]
     for f, c in zip(fns, clean):
         fc = clean_filename(f, replacement="_", no_spaces=True)
         assert fc == c
 
 
+def test_strip_punc():
+    assert strip_punc("(a.b, c)") == "ab c"
+    assert strip_punc("a,b", replacement="_") == "a_b"
+    assert strip_punc("[word];", filter_chars="[ ] ;") == "word"
+    s = strip_punc("--word.;", filter_chars=". - : ;", from_right=True)
+    assert s == "--word."
+    s = strip_punc("--word.;", filter_chars=". - : ;", from_left=True)
+    assert s == "word.;"
+    s = strip_punc("ab-word-ba", filter_chars="ab", from_right=True, from_left=True)
+    assert s == "-word-"
+    s = strip_punc("xabyab", filter_chars="ab y", replacement="z")
+    assert s == "xzzz"
+
+
 def test_word_split():
     t1 = "word0asfgja1Word1sdfasdlkas ;fdgj sdf gj;lkdsf2 wordals 2gjWORDksldhf3word 3alskdjfla;sd"
     s1 = word_split(t1, word_list="word als", case_sensitive=True)
@@ -448,3 +581,92 @@ def test_word_split():
         s2
         == "word 0asfgja1 Word 1sdfasdlkas ;fdgj sdf gj;lkdsf2 word als 2gj WORD ksldhf3 word 3 als kdjfla;sd"
     )
+
+
+def test_date_cache():
+    clear_date_cache()
+    d1 = parse_date("2021-04-05", languages=["en"], settings={"STRICT_PARSING": True})
+    d2 = parse_date(" 2021-04-05 ", languages=["en"], settings={"STRICT_PARSING": True})
+    assert d1 == d2
+    assert (d1.year, d1.month, d1.day) == (2021, 4, 5)
+    info = date_cache_info()
+    assert info.hits == 1
+    assert info.misses == 1
+    d3 = parse_date("05/04/2021", date_formats=["%d/%m/%Y"])
+    assert d3 == d1
+    dates = get_dates_from_text(["Date: 21-04-05", "21-04-05"])
+    assert len(dates) == 2
+    assert date_cache_info().hits > 1
+    set_date_cache_size(2)
+    assert date_cache_info().maxsize == 2
+    assert date_cache_info().currsize == 0
+    set_date_cache_size(DATE_CACHE_SIZE)
+
+
+def test_date_cache_relative(monkeypatch):
+    clear_date_cache()
+    # dates relative to the current time are never cached
+    d1 = parse_date("in 2 hours")
+    d2 = parse_date("in 2 hours")
+    assert d2 > d1
+    assert date_cache_info().currsize == 0
+
+    # dates relative to the current day are cached until the day changes
+    today = datetime.date.today()
+    d1 = parse_date("tomorrow noon")
+    assert d1 == datetime.datetime.combine(today, datetime.time(12)) + ONE_DAY
+    assert parse_date("tomorrow noon") == d1
+    assert date_cache_info().hits == 1
+
+    class NextDay(datetime.date):
+        @classmethod
+        def today(cls):
+            return today + ONE_DAY
+
+    monkeypatch.setattr(toolbox.datautils, "datetime", SimpleNamespace(date=NextDay))
+    misses = date_cache_info().misses
+    parse_date("tomorrow noon")
+    assert date_cache_info().misses == misses + 1
+    monkeypatch.undo()
+
+    # a fixed RELATIVE_BASE makes relative dates cacheable
+    base = datetime.datetime(2021, 4, 5, 10, 30, 15, 123)
+    settings = {"RELATIVE_BASE": base}
+    assert parse_date("in 2 hours", settings=settings) == base + 2 * ONE_HOUR
+    assert parse_date("in 2 hours", settings=settings) == base + 2 * ONE_HOUR
+    assert date_cache_info().hits == 2
+
+
+def test_quick_date():
+    d = datetime.datetime(2021, 4, 5)
+    assert quick_date("2021-04-05", date_order="YMD") == d
+    assert quick_date("2021-04-05", date_order="DMY") == datetime.datetime(2021, 5, 4)
+    assert quick_date("2021/13/05", date_order="YMD") == datetime.datetime(2021, 5, 13)
+    assert quick_date("04/05/2021", date_order="MDY") == d
+    assert quick_date("05/04/2021", date_order="DMY") == d
+    assert quick_date("05/13/2021", date_order="DMY") is None
+    assert quick_date("21-04-05", date_order="YMD") is None
+    assert quick_date("5 apr 2021") == d
+    assert quick_date("april 5 2021") == d
+    assert quick_date("2021 apr 5") == d
+    assert quick_date("feb 30 2021") is None
+    assert quick_date("date feb 3 2021") is None
+    assert pick_best_ymd("2021-04-05") == d
+    assert pick_best_ymd("04/05/2021") == d
+    dates = get_dates_from_text(["5 Apr 2021", "Apr 5, 2021", "2021/04/05"])
+    assert dates == [d, d, d]
+
+
+def test_word_freq():
+    words = "b a c a b d a e".split()
+    wf = word_freq(words)
+    assert wf == [("a", 3), ("b", 2), ("c", 1), ("d", 1), ("e", 1)]
+    assert word_freq(words, only_words=True) == ["a", "b", "c", "d", "e"]
+    assert word_freq(words, up_to=3) == wf[:3]
+    wf.clear()
+    assert len(word_freq(words)) == 5
+    assert word_freq_str(words, up_to=2) == "3x: a 2x: b "
+    assert word_freq(Counter(words), up_to=2) == [("a", 3), ("b", 2)]
+    assert word_freq_str(Counter(words), up_to=2) == "3x: a 2x: b "
+    assert word_freq_str(words, min_count=2) == "3x: a 2x: b "
+    assert most_popular(words) == "a"
@@ -26,6 +26,16 @@ fo.verbose_errors_only = False
 fo.safe_overwrite = False
 
 
+def test_file_size_str_array():
+    sizes = [0, 512, 1500, 2.5e6, 3e9, 6e9, float("nan"), float("inf"), -5]
+    for style in (None, "colour", "mono"):
+        s = file_size_str_array(sizes, style=style)
+        assert list(s) == [str(file_size_str(x, style=style)) for x in sizes]
+    s = file_size_str_array(sizes, style="mono")
+    assert "2.50 MB" in s[3]
+    assert s[6] == "0 bytes"
+
+
 def test_fileops():
     res = fo.get_file_list("./tests/testfiles", recursive=True)
     assert res
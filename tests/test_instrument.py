@@ -0,0 +1,53 @@
+# my modules
+from toolbox import *
+import toolbox.textproc
+
+
+def test_instrumentation():
+    original = get_dates_from_text
+    reset_call_stats()
+    assert not instrumentation_enabled()
+    enable_instrumentation()
+    assert instrumentation_enabled()
+    assert toolbox.textproc.get_dates_from_text is original
+    TextProc("Paid on July 21, 2019 at the shop").get_dates()
+    textproc_calls = call_stats()["get_dates_from_text"].count
+    # star imported references are timed too
+    get_dates_from_text(["Paid on July 22, 2019"])
+    assert call_stats()["get_dates_from_text"].count == textproc_calls + 1
+    ImageMixin.pad_image(np.zeros((10, 10, 3), dtype=np.uint8), 2)
+    disable_instrumentation()
+    assert not instrumentation_enabled()
+    assert toolbox.textproc.get_dates_from_text is original
+
+    stats = call_stats()
+    assert stats["TextProc.__init__"].count == 1
+    assert stats["TextProc.get_dates"].count == 1
+    assert stats["get_dates_from_text"].count > 0
+    assert stats["ImageMixin.pad_image"].count == 1
+    assert stats["ImageMixin.pad_image"].max <= stats["ImageMixin.pad_image"].total
+    assert "ImageMixin.crop_image" not in stats
+    lines = call_stats_str(sort_by="count").splitlines()
+    assert lines[0].startswith("get_dates_from_text")
+
+    TextProc("not counted")
+    assert call_stats()["TextProc.__init__"].count == 1
+    get_dates_from_text(["Paid on July 23, 2019"])
+    assert call_stats()["get_dates_from_text"].count == textproc_calls + 1
+    reset_call_stats()
+    assert call_stats() == {}
+
+
+def test_dump_call_stats(capsys):
+    reset_call_stats()
+    enable_instrumentation([("toolbox.imageutils", "ImageMixin.pad_image")])
+    ImageMixin.pad_image(np.zeros((10, 10, 3), dtype=np.uint8), 2)
+    disable_instrumentation()
+    dump_call_stats()
+    out = capsys.readouterr().out.splitlines()
+    assert len(out) == 1
+    assert "timing" in out[0] and "ImageMixin.pad_image" in out[0]
+    assert "calls:        1" in out[0]
+    dump_call_stats(log_output=False)
+    assert capsys.readouterr().out == ""
+    reset_call_stats()
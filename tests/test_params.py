@@ -1,5 +1,12 @@
+import os
+import pickle
+import pytest
+import subprocess
+import sys
+
 # my modules
 from toolbox import *
+import toolbox.objparams
 
 
 def test_apply_params():
@@ -20,6 +27,38 @@ def test_apply_params():
     assert tc.lmno == "My Params"
 
 
+def test_apply_params_hierarchy():
+    class Base:
+        PARAMS = {"a": 1, "d": {"x": 1, "y": 2}, "s": {"k": 0}}
+
+    class Child(Base):
+        PARAMS = {"b": 2, "d": {"y": 3}}
+
+        def __init__(self, c=0, **kwargs):
+            apply_params(self, kwargs, locals())
+
+    tc = Child(c=1, a=5, d={"z": 4})
+    assert tc.a == 5 and tc.b == 2 and tc.c == 1
+    assert tc.d == {"x": 1, "y": 3, "z": 4}
+    assert tc.s is Base.PARAMS["s"]
+
+    # merged nested dicts are not shared between instances
+    t1, t2 = Child(), Child()
+    assert t1.d == {"x": 1, "y": 3}
+    t1.d["x"] = 10
+    assert t2.d["x"] == 1 and Child().d["x"] == 1
+
+    # reassigned PARAMS are picked up
+    merged, _ = class_params(Child)
+    assert class_params(Child)[0] is merged
+    Base.PARAMS = {"a": 7}
+    assert Child().a == 7 and "s" not in Child().__dict__
+    Child.PARAMS["b"] = 8
+    assert Child().b == 2
+    clear_class_params_cache(Child)
+    assert Child().b == 8
+
+
 def test_yaml_params():
     tp = Params(yml="./tests/test_params.yml")
     assert "abc" in tp.__dict__
@@ -41,3 +80,113 @@ def test_yaml_params():
     assert tp.hijk.c4[-1] == 13
     assert tp.abc.a4 == 8.0
     assert tp.abc.a5 == 48.0
+
+
+def test_convert_values():
+    assert convert_value_with_unit("2 in") == 50.8
+    assert convert_value_with_unit("16 mm", baseunit="studs") == 2.0
+    assert convert_value_with_unit("72 pt", baseunit="inch") == 1.0
+    assert convert_value_with_unit("7 studs", baseunit=None) == 7.0
+    assert convert_value_with_unit("10 cm") == "10 cm"
+    values = ["1 in", "25 %", "My Params", 3, "2 studs"]
+    assert convert_values(values) == [25.4, 0.25, "My Params", 3, 16.0]
+    d = convert_values({"a": "1 in", "b": "x"}, baseunit="mm")
+    assert d == {"a": 25.4, "b": "x"}
+
+
+def test_lazy_params():
+    tp = Params(yml="./tests/test_params.yml")
+    tl = Params(yml="./tests/test_params.yml", lazy=True)
+    assert isinstance(tl, LazyParams)
+    assert dict.__getitem__(tl, "defg") == {
+        "b1": "10 %",
+        "b2": "25 mm",
+        "b3": "7 studs",
+    }
+    assert tl.defg.b3 == 56.0
+    assert isinstance(tl.defg, LazyParams)
+    assert dict.__getitem__(tl.defg, "b3") == 56.0
+    assert dict.__getitem__(tl.defg, "b1") == "10 %"
+    assert tl["defg"]["b1"] == 0.1
+    assert tl.abc.a5 == 48.0
+    assert len(tl.hijk.c4) == 7
+    assert tl.get("nothing", 3) == 3
+    assert tl == tp
+    tl.extra = "5 mm"
+    assert tl["extra"] == "5 mm"
+    with pytest.raises(AttributeError):
+        tl.nothing
+
+    # copies convert values like item access does
+    tl = Params(yml="./tests/test_params.yml", lazy=True)
+    assert "abc" in tl.__dict__
+    assert dict(tl)["defg"]["b1"] == 0.1
+    assert isinstance({**tl}["defg"], LazyParams)
+    assert tl.copy() == dict(tp)
+    assert dict(tl) == dict(tp)
+    tl = Params(yml="./tests/test_params.yml", lazy=True)
+    tu = pickle.loads(pickle.dumps(tl))
+    assert dict.__getitem__(tu, "defg")["b1"] == "10 %"
+    assert tu == tp
+
+
+def test_params_cache(tmp_path):
+    (tmp_path / "base.yml").write_text("pitch: 8.0\n")
+    main = tmp_path / "main.yml"
+    main.write_text("extend: ['base.yml']\nabc:\n  a1: '2 studs'\n  a2: ${pitch}\n")
+    cache = str(tmp_path / "cache")
+    tp = Params(yml=str(main), cache=cache)
+    assert tp.abc.a1 == 16.0
+    assert len(os.listdir(cache)) == 1
+
+    # a cached load must not parse any YAML
+    read_yaml = toolbox.objparams.MetaYaml
+    toolbox.objparams.MetaYaml = None
+    try:
+        tc = Params(yml=str(main), cache=cache)
+    finally:
+        toolbox.objparams.MetaYaml = read_yaml
+    assert tc == tp
+    assert isinstance(tc.abc, Params)
+    assert tc.abc.a2 == 8.0
+
+    # changing an included file invalidates the cache
+    (tmp_path / "base.yml").write_text("pitch: 10.0\n")
+    tc = Params(yml=str(main), cache=cache)
+    assert tc.abc.a2 == 10.0
+    assert Params(yml=str(main), cache=cache, baseunit="studs").abc.a1 == 2.0
+    assert len(os.listdir(cache)) == 2
+
+
+def test_params_cache_globs(tmp_path):
+    (tmp_path / "parts").mkdir()
+    (tmp_path / "parts" / "a.yml").write_text("a: 1\n")
+    main = tmp_path / "main.yml"
+    main.write_text("extend: ['parts/*.yml']\ntop: 0\n")
+    cache = str(tmp_path / "cache")
+    assert sorted(Params(yml=str(main), cache=cache)) == ["a", "top"]
+    assert sorted(Params(yml=str(main), cache=cache)) == ["a", "top"]
+
+    # a new file matching an extend glob invalidates the cache
+    (tmp_path / "parts" / "b.yml").write_text("b: 2\n")
+    assert sorted(Params(yml=str(main), cache=cache)) == ["a", "b", "top"]
+    assert sorted(Params(yml=str(main), cache=cache, lazy=True)) == ["a", "b", "top"]
+
+    # and so does a new file matching a yml glob
+    pattern = str(tmp_path / "parts" / "*.yml")
+    assert sorted(Params(yml=pattern, cache=cache)) == ["a", "b"]
+    (tmp_path / "parts" / "c.yml").write_text("c: 3\n")
+    assert sorted(Params(yml=pattern, cache=cache)) == ["a", "b", "c"]
+
+
+def test_lazy_import():
+    code = (
+        "import sys, toolbox; "
+        "p = toolbox.Params(obj={'a': '2 in'}); r = toolbox.Rect(2, 3); "
+        "loaded = [m for m in ('dateparser', 'nltk', 'crayons', 'toolbox.constants') "
+        "if type(sys.modules.get(m)).__name__ == 'module']; "
+        "print(','.join(loaded))"
+    )
+    res = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert res.returncode == 0
+    assert res.stdout.strip() == ""
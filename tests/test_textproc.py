@@ -33,3 +33,117 @@ def test_filter():
     assert len(t1.words) == 57
     assert len(t1.word_set) == 27
     assert len(t1.split_text) == 122
+
+
+def test_get_dates():
+    t1 = TextProc(text=test_text)
+    assert len(t1.dates) == 7
+    dates = t1.get_dates(stages=["lines"])
+    assert len(dates) == 1
+    dates = t1.get_dates(stages=["lines", "tokens"])
+    assert len(dates) == 3
+    dates = t1.get_dates(min_dates=1)
+    assert len(dates) == 1
+    t2 = TextProc(text="Paid on July 21, 2019 at the shop")
+    assert t2.best_date == "2019-07-21"
+    assert len(t2.get_dates(stages=["lines", "tokens"])) == 0
+
+
+def test_lazy_features():
+    t1 = TextProc(text=test_text)
+    assert "dates" not in t1.__dict__
+    assert "info@abc.com" in t1.email_address
+    assert "tokens" in t1.__dict__
+    assert "dates" not in t1.__dict__
+    assert "2022-10-09" not in t1.numbers
+    assert "dates" in t1.__dict__
+    t2 = TextProc(text="call 613 or 42", features=["numbers", "email_address"])
+    assert t2.__dict__["numbers"] == ["613", "42"]
+    assert "dates" not in t2.__dict__
+    assert t2.dates == []
+
+
+def test_word_counts():
+    t1 = TextProc(text="the cat saw a Cat and a dog saw the cat")
+    assert "word_counts" not in t1.__dict__
+    word_set = t1.word_set
+    assert t1.__dict__["word_counts"] == Counter(t1.words)
+    assert word_set == word_freq(t1.words, only_words=True)
+    assert word_set[0] == "cat"
+    assert "3x: cat" in str(t1)
+
+
+def test_stopwords():
+    sw = stopwords()
+    assert isinstance(sw, frozenset)
+    assert "the" in sw
+    assert stopwords(["english", "french"]) is sw
+    t1 = TextProc(text="the cat and le chat")
+    t2 = TextProc(text="the cat and le chat", languages=["english"])
+    assert t1.filter is sw
+    assert t1.words == ["cat", "chat"]
+    assert t2.words == ["cat", "le", "chat"]
+
+
+def test_stream():
+    lines = iter(test_text.splitlines())
+    ts = TextProcStream(lines, date_stages=("lines", "tokens", "3-grams"))
+    t1 = TextProc(text=test_text)
+    assert ts.line_count == len(test_text.splitlines())
+    assert ts.word_count == len(t1.split_text)
+    assert sum(ts.words.values()) == len(t1.words)
+    assert len(ts.words) == len(t1.word_set)
+    assert sum(ts.email_address.values()) == 3
+    assert ts.capitalized_words["Max"] == 1
+    assert sum(ts.dates.values()) == 4
+    assert ts.best_date == "2011-02-28"
+    assert "2022-10-09" not in ts.numbers
+    ts.update("Another date 2022-10-09\nand again 2022-10-09")
+    assert ts.best_date == "2022-10-09"
+    ts = TextProcStream(test_text, max_items=2)
+    assert all(len(c) <= 4 for c in ts.counters)
+
+
+def test_text_stats():
+    import pickle
+
+    t1 = TextProc(text=test_text)
+    t2 = TextProc(text="Another date 2022-10-09 and Python 2022-10-09")
+    t3 = TextProc(text="Python PYTHON 42")
+    s1, s2, s3 = t1.stats(), t2.stats(), t3.stats()
+    assert s1.best_date == t1.best_date
+    assert sum(s1.words.values()) == len(t1.words)
+    assert (s1 + s2) + s3 == s1 + (s2 + s3)
+    st = TextStats.reduce([s1, s2, s3])
+    assert st == s1.merge(s2).merge(s3)
+    assert st.doc_count == 3
+    assert st.word_count == len(t1.split_text) + len(t2.split_text) + 3
+    d = datetime.datetime(2022, 10, 9)
+    assert st.dates[d] == s1.dates[d] + s2.dates[d]
+    assert st.best_date == "2022-10-09"
+    assert st.capitalized_words["Python"] == 3
+    assert st.numbers["42"] == 1
+    assert st.top_words(2) == [("date", 6), ("may", 6)]
+    assert pickle.loads(pickle.dumps(st)) == st
+    assert s1.doc_count == 1
+    ts = TextProcStream(test_text)
+    assert ts.stats().word_count == s1.word_count
+
+
+def test_tokenize():
+    text = "The (cat) sat; on 3 mats, [2022-10-09] • done."
+    words, tokens, offsets = tokenize(text, stopwords())
+    assert words == ["cat", "sat", "mats", "done"]
+    assert tokens == ["cat", "sat", "3", "mats", "2022-10-09", "done"]
+    assert [text[s:e] for s, e in offsets] == [
+        "(cat)",
+        "sat;",
+        "3",
+        "mats,",
+        "[2022-10-09]",
+        "done.",
+    ]
+    t1 = TextProc(text=text)
+    assert t1.raw_words == t1.filter_text(ignore_numbers=True)
+    assert t1.tokens == t1.filter_text(ignore_numbers=False)
+    assert len(t1.token_offsets) == len(t1.tokens)
@@ -1,5 +1,6 @@
 """toolbox - A general purpose collection of useful python tools and utility functions."""
 
+import importlib
 import os
 
 # fmt: off
@@ -11,25 +12,58 @@ VERSION = __project__ + "-" + __version__
 
 script_dir = os.path.dirname(__file__)
 
-from .constants import *
 from .objparams import apply_params
-from .objparams import Params, convert_value_with_unit
-from .files import SuppressStdoutStderr, full_path, split_path, split_filename, FileOps
-from .datautils import *
+from .objparams import (
+    Params,
+    LazyParams,
+    class_params,
+    clear_class_params_cache,
+    convert_value_with_unit,
+    convert_values,
+    params_cache_dir,
+)
 from .imageutils import ImageMixin
-from .textproc import TextProc
-from .scripts import foldercheck
-from .niceprint import (
-    file_size_str,
-    colour_path_str,
-    progress_bar,
-    logmsg,
-    toolboxprint,
-    rich_colour_str,
-    strip_rich_str,
-    emoji_code_from_country,
+from .instrument import (
+    CallStats,
+    instrumented,
+    enable_instrumentation,
+    disable_instrumentation,
+    instrumentation_enabled,
+    call_stats,
+    call_stats_str,
+    reset_call_stats,
+    dump_call_stats,
+    start_call_stats_dump,
+    stop_call_stats_dump,
 )
 
+# Submodules which pull in heavy dependencies (dateparser, nltk, crayons) or
+# build the large constant tables are only imported on first access of one
+# of their names through the module __getattr__ below.
+_LAZY_SUBMODULES = ("constants", "datautils", "files", "niceprint", "textproc")
+_LAZY_STAR_MODULES = (".constants", ".datautils")
+_LAZY_NAMES = {
+    "SuppressStdoutStderr": ".files",
+    "full_path": ".files",
+    "split_path": ".files",
+    "split_filename": ".files",
+    "FileOps": ".files",
+    "TextProc": ".textproc",
+    "TextProcStream": ".textproc",
+    "TextStats": ".textproc",
+    "stopwords": ".textproc",
+    "tokenize": ".textproc",
+    "file_size_str": ".niceprint",
+    "file_size_str_array": ".niceprint",
+    "colour_path_str": ".niceprint",
+    "progress_bar": ".niceprint",
+    "logmsg": ".niceprint",
+    "toolboxprint": ".niceprint",
+    "rich_colour_str": ".niceprint",
+    "strip_rich_str": ".niceprint",
+    "emoji_code_from_country": ".niceprint",
+}
+
 from .geometry.vector import *
 from .geometry.point import (
     Point,
@@ -46,3 +80,44 @@ from .geometry.rect import *
 from .geometry.layout import *
 
 from .geometry.animators import *
+
+
+def _load_star_module(name):
+    module = importlib.import_module(name, __name__)
+    for k, v in vars(module).items():
+        if not k.startswith("_"):
+            globals().setdefault(k, v)
+    return module
+
+
+def _load_all():
+    for name in _LAZY_STAR_MODULES:
+        _load_star_module(name)
+    for name in _LAZY_NAMES:
+        __getattr__(name)
+    __getattr__("foldercheck")
+
+
+def __getattr__(name):
+    if name == "__all__":
+        _load_all()
+        return [k for k in globals() if not k.startswith("_")]
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module("." + name, __name__)
+    if name == "foldercheck":
+        value = importlib.import_module(".scripts.foldercheck", __name__)
+    elif name in _LAZY_NAMES:
+        value = getattr(importlib.import_module(_LAZY_NAMES[name], __name__), name)
+    else:
+        for module in _LAZY_STAR_MODULES:
+            if name in vars(_load_star_module(module)):
+                break
+        if name not in globals():
+            raise AttributeError("module %r has no attribute %r" % (__name__, name))
+        return globals()[name]
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES) | set(_LAZY_SUBMODULES))
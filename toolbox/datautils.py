@@ -25,17 +25,22 @@
 #
 
 import datetime
-import dateparser
 import math
-import numpy as np
-import cv2
+import re
 import string
-import itertools
-import nltk
+import heapq
+from collections import Counter
+from functools import cached_property, lru_cache
 from re import search, match
 from email.header import decode_header, make_header
 
 from toolbox.constants import *
+from toolbox.instrument import instrumented
+from toolbox.lazyimport import lazy_import
+
+cv2 = lazy_import("cv2")
+dateparser = lazy_import("dateparser")
+np = lazy_import("numpy")
 
 
 def str_constraint(constraint, check_value, tolerance=0.1):
@@ -141,55 +146,79 @@ def parse_value_into(var, text, spec, max_value=None):
     return var
 
 
-def parse_value(text, spec, max_value=None, first=False, last=False):
-    """Finds a value embedded in a formatted string (spec) in the form of
-    'placeholder placeholder2 %v placeholder3' where placeholder text
-    helps locate the desired value denoted by %v"""
-    text = text.replace("|", "")
-    text = text.replace("]", "")
-    text = text.replace("[", "")
-    slen = len(spec.split())
-    value = None
-    if spec == "$":
-        for t in text.split():
-            if len(t) > 0:
-                if t[0] == "$":
-                    x = t.replace("$", "")
-                    try:
-                        value = float(x)
-                        if max_value is not None:
-                            if value <= max_value:
-                                return value
-                            else:
-                                return None
-                        else:
-                            return value
-                    except:
-                        pass
-    vals = []
-    words = text.split()
-    word = 0
-    for phrase in n_grams(text, slen, as_list=True):
-        matches = 0
+VALUE_TEXT_TABLE = str.maketrans("", "", "|[]")
+VALUE_PLACEHOLDERS = ("%t", "%v", "%*")
+
+
+class ValueTemplate:
+    """A parse_value spec compiled into a regular expression so that it can be
+    applied to many documents without re-parsing the spec.  Specs are in
+    the form 'placeholder %v placeholder2' where %v denotes a float value,
+    %t a text word and %* the remaining text from that word onwards."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.is_dollar = spec == "$"
+        words = spec.split()
+        self.kinds = [w for w in words if w in VALUE_PLACEHOLDERS]
+        if self.is_dollar:
+            pattern = r"\$\S*"
+        else:
+            parts = [
+                r"(\S+)" if w in VALUE_PLACEHOLDERS else re.escape(w) for w in words
+            ]
+            pattern = r"\s+".join(parts)
+        self.regex = re.compile(r"(?<!\S)" + pattern + r"(?!\S)")
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.spec)
+
+    def _values(self, text, m):
+        if self.is_dollar:
+            try:
+                return [float(m.group(0).replace("$", ""))]
+            except ValueError:
+                return None
         vals = []
-        if len(phrase) == slen:
-            for i, p in enumerate(zip(phrase, spec.split())):
-                if p[0] == p[1]:
-                    matches += 1
-                if p[1] == "%t":
-                    vals.append(str(p[0]))
-                elif p[1] == "%v":
-                    try:
-                        x = p[0].replace("$", "")
-                        x = x.replace("%", "")
-                        vals.append(float(x))
-                    except:
-                        pass
-                elif p[1] == "%*":
-                    vals.append(" ".join(words[word + i :]))
-        word += 1
-
-        if matches == slen - len(vals):
+        for i, kind in enumerate(self.kinds):
+            word = m.group(i + 1)
+            if kind == "%t":
+                vals.append(word)
+            elif kind == "%v":
+                try:
+                    vals.append(float(word.replace("$", "").replace("%", "")))
+                except ValueError:
+                    return None
+            else:
+                vals.append(" ".join(text[m.start(i + 1) :].split()))
+        return vals
+
+    def finditer(self, text):
+        """Yields the list of placeholder values for every occurrence of the
+        template in text, scanning the text once."""
+        text = str(text).translate(VALUE_TEXT_TABLE)
+        pos = 0
+        while True:
+            m = self.regex.search(text, pos)
+            if m is None:
+                return
+            vals = self._values(text, m)
+            if vals is not None:
+                yield vals
+            pos = m.start() + 1
+
+    def findall(self, text):
+        """Returns a list of placeholder value lists for every occurrence."""
+        return list(self.finditer(text))
+
+    def search(self, text, max_value=None, first=False, last=False):
+        """Returns the value(s) from the first occurrence of the template in
+        text in the same form as parse_value."""
+        for vals in self.finditer(text):
+            if self.is_dollar:
+                if max_value is not None and vals[0] > max_value:
+                    return None
+                return vals[0]
             if len(vals) == 1:
                 return vals[0]
             if first:
@@ -197,7 +226,22 @@ def parse_value(text, spec, max_value=None, first=False, last=False):
             if last:
                 return vals[-1]
             return vals
-    return None
+        return None
+
+
+@lru_cache(maxsize=1024)
+def value_template(spec):
+    """Returns a cached ValueTemplate compiled from spec."""
+    return ValueTemplate(spec)
+
+
+def parse_value(text, spec, max_value=None, first=False, last=False):
+    """Finds a value embedded in a formatted string (spec) in the form of
+    'placeholder placeholder2 %v placeholder3' where placeholder text
+    helps locate the desired value denoted by %v"""
+    return value_template(spec).search(
+        text, max_value=max_value, first=first, last=last
+    )
 
 
 def is_phrase_in_text(phrase_items, text, case_sensitive=False):
@@ -316,33 +360,62 @@ def get_uppercase_words(text):
     return s
 
 
+NUMBER_RE = re.compile(r"(?!\.+$|-+$)[0-9.\-]+")
+HAS_NUMBER_RE = re.compile(r"[0-9\-]")
+
+
+def is_number(word):
+    """Returns true if word only contains numeric characters 0-9, '.' or '-'
+    and is not a trivial run of only '.' or '-'"""
+    return NUMBER_RE.fullmatch(word) is not None
+
+
+def numbers_mask(words):
+    """Returns a numpy boolean mask labelling which words are valid numbers"""
+    fullmatch = NUMBER_RE.fullmatch
+    return np.fromiter(
+        (fullmatch(w) is not None for w in words), dtype=bool, count=len(words)
+    )
+
+
+def has_numbers_mask(words):
+    """Returns a numpy boolean mask labelling which words contain numbers"""
+    search = HAS_NUMBER_RE.search
+    return np.fromiter(
+        (search(w) is not None for w in words), dtype=bool, count=len(words)
+    )
+
+
 def get_numbers(text):
     """Finds valid numeric values in text and return in a list"""
-    s = []
     if isinstance(text, list):
         text = " ".join(text)
     text = str(text)
-    nums = tuple("0123456789.-")
-    for t in text.split():
-        ok = True
-        for c in t:
-            if c not in nums:
-                ok = False
-                break
-        if ok:
-            # check for invalid trivial single - or .
-            if not all([x == "." for x in t]) and not all([x == "-" for x in t]):
-                s.append(t)
-    return s
+    fullmatch = NUMBER_RE.fullmatch
+    return [t for t in text.split() if fullmatch(t) is not None]
 
 
 def has_numbers(word):
     """Returns true if numbers are in word"""
-    nums = tuple("0123456789-")
-    for c in word:
-        if c in nums:
-            return True
-    return False
+    return HAS_NUMBER_RE.search(word) is not None
+
+
+DEFAULT_PUNC = ", . ; : - _ / ? ! @ & % ( ) [ ] { }"
+
+
+@lru_cache(maxsize=256)
+def punc_table(filter_chars, replacement=""):
+    """Returns a cached (translation table, character set) pair for the space
+    separated filter_chars used by strip_punc.  The translation table is None
+    if filter_chars contains multi-character items or the replacement could
+    be re-replaced, in which case the items must be replaced one by one."""
+    items = filter_chars.split()
+    chars = frozenset("".join(items))
+    if any(len(c) > 1 for c in items):
+        return None, chars
+    if len(replacement) > 1 and any(c in chars for c in replacement):
+        return None, chars
+    return str.maketrans({c: replacement for c in items}), chars
 
 
 def strip_punc(
@@ -350,14 +423,19 @@ def strip_punc(
 ):
     """Strips any common punctuation characters from text"""
     if filter_chars is None:
-        filter_chars = ", . ; : - _ / ? ! @ & % ( ) [ ] { }"
-    if from_right:
+        filter_chars = DEFAULT_PUNC
+    table, chars = punc_table(filter_chars, replacement)
+    # each filter item is stripped in turn, so only strip when the text
+    # actually ends or starts with one of the filter characters
+    if from_right and len(text) > 0 and text[-1] in chars:
         for c in filter_chars.split():
             text = text.rstrip(c)
-    if from_left:
+    if from_left and len(text) > 0 and text[0] in chars:
         for c in filter_chars.split():
             text = text.lstrip(c)
     if not from_right and not from_left:
+        if table is not None:
+            return text.translate(table)
         for c in filter_chars.split():
             text = text.replace(c, replacement)
     return text
@@ -410,30 +488,35 @@ def str_from_mime_words(text):
     return ss.lstrip().rstrip()
 
 
+FILENAME_PUNC = "/ \\ & , ; : + @ % *"
+
+
+@lru_cache(maxsize=16)
+def _filename_sanitizer(replacement, no_spaces):
+    """Returns a cached (translation table, tidy regex) pair for clean_filename."""
+    items = FILENAME_PUNC.split()
+    if no_spaces:
+        items.append(" ")
+    table = str.maketrans({c: replacement for c in items})
+    if not no_spaces or len(replacement) == 0:
+        return table, None
+    r = re.escape(replacement)
+    tidy = re.compile(r"(?:%s)*(-)(?:%s)*|(?:%s)+(\.)|(?:%s){2,}" % (r, r, r, r))
+    return table, tidy
+
+
 def clean_filename(text, replacement="_", no_spaces=True):
     """Returns a safe string object suitable for a filename.
-    Objectionable characters such as path separators / \,
+    Objectionable characters such as path separators / \\,
     punctuation, etc. are removed and substituted with either an
     underscore or other optionally specified character."""
     text = str_from_mime_words(text)
-    text = strip_punc(
-        text, filter_chars="/ \\ & , ; : + @ % *", replacement=replacement
-    )
-    if no_spaces:
+    table, tidy = _filename_sanitizer(replacement, no_spaces)
+    text = text.translate(table)
+    if tidy is not None:
         # get rid of spurious replacements around - and . (looks better)
-        text = text.replace("  ", replacement).replace(" ", replacement)
-        rep = "%s-%s" % (replacement, replacement)
-        text = text.replace(rep, "-")
-        rep = "%s-" % (replacement)
-        text = text.replace(rep, "-")
-        rep = "-%s" % (replacement)
-        text = text.replace(rep, "-")
-        rep = "%s." % (replacement)
-        text = text.replace(rep, ".")
-        # get rid of consecutive runs of replacement chars
-        for n in [4, 3, 2]:
-            rep = replacement * n
-            text = text.replace(rep, replacement)
+        # and consecutive runs of replacement chars
+        text = tidy.sub(lambda m: m.group(1) or m.group(2) or replacement, text)
     return text
 
 
@@ -506,33 +589,167 @@ def cleanup_date(date, use_space=False):
     return cd.rstrip()
 
 
+DATE_CACHE_SIZE = 4096
+
+
+def _parse_date(phrase, languages, settings, date_formats):
+    if date_formats is not None:
+        d = dateparser.date.parse_with_formats(
+            phrase, date_formats=list(date_formats), settings=dateparser.conf.settings
+        )
+        if isinstance(d, dateparser.date.DateData):
+            return d.date_obj
+        return None
+    languages = list(languages) if languages is not None else None
+    settings = dict(settings) if settings is not None else None
+    return dateparser.parse(phrase, languages=languages, settings=settings)
+
+
+class _UncachedDate(Exception):
+    """Returns a parsed date through lru_cache without caching it."""
+
+    def __init__(self, date):
+        self.date = date
+
+
+def _parse_date_cacheable(phrase, languages, settings, date_formats, today):
+    d = _parse_date(phrase, languages, settings, date_formats)
+    # phrases relative to the current time (e.g. "in 2 hours", "tomorrow")
+    # keep the microseconds of now, absolute dates have none
+    if today is not None and d is not None and d.microsecond:
+        raise _UncachedDate(d)
+    return d
+
+
+_date_cache = lru_cache(maxsize=DATE_CACHE_SIZE)(_parse_date_cacheable)
+
+
+def parse_date(phrase, languages=None, settings=None, date_formats=None):
+    """Parses a date phrase with dateparser through a bounded LRU cache.
+    Phrases are normalized for whitespace and cached together with the
+    languages, settings and date_formats so that repeated phrases are only
+    parsed once.  Unless settings has a RELATIVE_BASE, cached dates expire at
+    the end of the day and dates relative to the current time are not cached.
+    If date_formats is provided, the phrase is parsed with
+    dateparser.date.parse_with_formats instead."""
+    phrase = " ".join(phrase.split())
+    today = datetime.date.today()
+    if languages is not None:
+        languages = tuple(languages)
+    if settings is not None:
+        if "RELATIVE_BASE" in settings:
+            today = None
+        settings = tuple(sorted(settings.items()))
+    if date_formats is not None:
+        date_formats = tuple(date_formats)
+    key = (phrase, languages, settings, date_formats)
+    try:
+        hash(key)
+    except TypeError:
+        # unhashable settings values cannot be cached
+        return _parse_date(*key)
+    try:
+        return _date_cache(*key, today)
+    except _UncachedDate as e:
+        return e.date
+
+
+def set_date_cache_size(size):
+    """Sets the maximum number of cached date phrases (None for unbounded).
+    The existing cache contents and statistics are discarded."""
+    global _date_cache
+    _date_cache = lru_cache(maxsize=size)(_parse_date_cacheable)
+
+
+def date_cache_info():
+    """Returns the date cache statistics as a (hits, misses, maxsize, currsize)
+    named tuple."""
+    return _date_cache.cache_info()
+
+
+def clear_date_cache():
+    """Clears the date cache contents and statistics."""
+    _date_cache.cache_clear()
+
+
+DATE_MONTHS = {}
+for _i, _month in enumerate(
+    "january february march april may june july august september october "
+    "november december".split()
+):
+    DATE_MONTHS[_month] = _i + 1
+    DATE_MONTHS[_month[:3]] = _i + 1
+DATE_MONTHS["sept"] = 9
+YMD_RE = re.compile(r"^\d{2,4}[\/-]\d{1,2}[\/-]\d{1,2}$")
+MDY_RE = re.compile(r"^\d{1,2}[\/-]\d{1,2}[\/-]\d{4}$")
+NUMERIC_DATE_RE = re.compile(
+    r"(\d{4})([\/-])(\d{1,2})\2(\d{1,2})|(\d{1,2})([\/-])(\d{1,2})\6(\d{4})"
+)
+DURATION_WORDS = ("month", "year", "day", "week", "hour", "min", "h")
+
+
+def _make_date(year, month, day, swap=False):
+    try:
+        return datetime.datetime(year, month, day)
+    except ValueError:
+        if swap:
+            return _make_date(year, day, month)
+    return None
+
+
+def quick_date(phrase, date_order=None):
+    """Fast recognizer for common date forms which returns the same date as
+    dateparser.parse with STRICT_PARSING and the optional DATE_ORDER setting.
+    Numeric dates with a 4 digit year such as 2021-04-05 or 04/05/2021 are
+    recognized when date_order is provided.  English month name forms such as
+    "5 apr 2021", "april 5 2021" or "2021 apr 5" are recognized when it is not.
+    Returns None if the phrase is not recognized or not a valid date so that
+    the caller can fall back to dateparser."""
+    if date_order is not None:
+        m = NUMERIC_DATE_RE.fullmatch(phrase)
+        if m is None:
+            return None
+        if m.group(1) is not None:
+            y, a, b = int(m.group(1)), int(m.group(3)), int(m.group(4))
+            if date_order == "DMY":
+                return _make_date(y, b, a)
+            return _make_date(y, a, b, swap=a > 12)
+        y, a, b = int(m.group(8)), int(m.group(5)), int(m.group(7))
+        if date_order == "MDY" or (date_order == "YMD" and len(m.group(5)) == 1):
+            return _make_date(y, a, b, swap=a > 12)
+        if date_order == "DMY":
+            return _make_date(y, b, a)
+        return _make_date(y, b, a, swap=b > 12)
+    w = phrase.split()
+    if len(w) != 3:
+        return None
+    if w[0] in DATE_MONTHS:
+        month, day, year = w
+    elif w[1] in DATE_MONTHS and len(w[0]) == 4:
+        year, month, day = w
+    elif w[1] in DATE_MONTHS:
+        day, month, year = w
+    else:
+        return None
+    if not (len(year) == 4 and year.isdigit() and day.isdigit()):
+        return None
+    return _make_date(int(year), DATE_MONTHS[month], int(day))
+
+
 def pick_best_ymd(date):
     """Choose the best date candidate from a triple numerical representation of
     date in either YMD, MDY, or DMY."""
-    ymd_date = dateparser.parse(
-        date,
-        languages=["en"],
-        settings={
-            "STRICT_PARSING": True,
-            "DATE_ORDER": "YMD",
-        },
-    )
-    mdy_date = dateparser.parse(
-        date,
-        languages=["en"],
-        settings={
-            "STRICT_PARSING": True,
-            "DATE_ORDER": "MDY",
-        },
-    )
-    dmy_date = dateparser.parse(
-        date,
-        languages=["en"],
-        settings={
-            "STRICT_PARSING": True,
-            "DATE_ORDER": "DMY",
-        },
-    )
+
+    def _parse_order(order):
+        d = quick_date(date, date_order=order)
+        if d is not None:
+            return d
+        return parse_date(
+            date,
+            languages=["en"],
+            settings={"STRICT_PARSING": True, "DATE_ORDER": order},
+        )
+
     # ensure 4 digit year formats are preferred over 2 digit years
     if "-" in date:
         ds = date.split("-")
@@ -543,10 +760,13 @@ def pick_best_ymd(date):
     if ds is not None:
         ls = "".join([str(len(x)) for x in ds])
         if ls == "422":
-            return ymd_date
+            return _parse_order("YMD")
         elif ls == "224":
-            return mdy_date
+            return _parse_order("MDY")
 
+    ymd_date, mdy_date, dmy_date = [
+        _parse_order(order) for order in ("YMD", "MDY", "DMY")
+    ]
     today = datetime.datetime.today()
     if all([d is not None for d in [ymd_date, mdy_date, dmy_date]]):
         dates = [
@@ -560,8 +780,11 @@ def pick_best_ymd(date):
     return None
 
 
-def get_dates_from_text(phrases, preferred_format=None, debug=False):
-    """Finds candidate dates from provided text."""
+@instrumented("get_dates_from_text")
+def get_dates_from_text(phrases, preferred_format=None, debug=False, cleaned=False):
+    """Finds candidate dates from provided text.
+    If cleaned is True, the phrases have already been passed through
+    cleanup_date(phrase, use_space=True)."""
 
     def _valid_date(d):
         if d.year < 1995 or d.year > 2040:
@@ -576,14 +799,18 @@ def get_dates_from_text(phrases, preferred_format=None, debug=False):
         else:
             date_formats = [cleanup_date(preferred_format)]
     for phrase in phrases:
-        phrase = cleanup_date(phrase, use_space=True)
+        if not cleaned:
+            phrase = cleanup_date(phrase, use_space=True)
         if len(phrase) < 8:
             continue
+        # guard against time duration phrases
+        if any([e in phrase for e in DURATION_WORDS]):
+            continue
         new_date = None
 
         if date_formats is None:
-            ymd = search("^\d{2,4}[\/-]\d{1,2}[\/-]\d{1,2}$", phrase)
-            mdy = search("^\d{1,2}[\/-]\d{1,2}[\/-]\d{4}$", phrase)
+            ymd = YMD_RE.search(phrase)
+            mdy = MDY_RE.search(phrase)
             if ymd is not None:
                 new_date = pick_best_ymd(ymd.group(0))
             elif mdy is not None:
@@ -592,8 +819,8 @@ def get_dates_from_text(phrases, preferred_format=None, debug=False):
                 ps = phrase.split()
                 if len(ps) > 1:
                     for p in ps:
-                        ymd = search("^\d{2,4}[\/-]\d{1,2}[\/-]\d{1,2}$", p)
-                        mdy = search("^\d{1,2}[\/-]\d{1,2}[\/-]\d{4}$", p)
+                        ymd = YMD_RE.search(p)
+                        mdy = MDY_RE.search(p)
                         if ymd is not None:
                             new_date = pick_best_ymd(ymd.group(0))
                         elif mdy is not None:
@@ -626,12 +853,7 @@ def get_dates_from_text(phrases, preferred_format=None, debug=False):
             if sum([len(e) == 1 for e in split_phrase]) >= 2:
                 skip = True
             if date_formats is not None:
-                d = dateparser.date.parse_with_formats(
-                    phrase, date_formats=date_formats, settings=None
-                )
-                if isinstance(d, dateparser.date.DateData):
-                    if d.date_obj is not None:
-                        new_date = d.date_obj
+                new_date = parse_date(phrase, date_formats=date_formats)
             elif not skip:
                 # guard against a long number string being confused as a timestamp
                 if len(split_phrase) == 1 and not any(
@@ -639,24 +861,18 @@ def get_dates_from_text(phrases, preferred_format=None, debug=False):
                 ):
                     new_date = None
                 else:
-                    new_date = dateparser.parse(
-                        phrase,
-                        languages=["en"],
-                        settings={"STRICT_PARSING": True},
-                    )
+                    new_date = quick_date(phrase)
+                    if new_date is None:
+                        new_date = parse_date(
+                            phrase,
+                            languages=["en"],
+                            settings={"STRICT_PARSING": True},
+                        )
 
         if new_date is not None:
             # guard against a long number string being confused as a timestamp
             if len(split_phrase) == 1 and not any([c in phrase for c in ["/", "-"]]):
                 new_date = None
-            # guard against time duration phrases
-            if any(
-                [
-                    e in phrase.lower()
-                    for e in ["month", "year", "day", "week", "hour", "min", "h"]
-                ]
-            ):
-                new_date = None
         if new_date is not None:
             cdate = _valid_date(new_date)
             if cdate is not None:
@@ -732,60 +948,129 @@ def replace_prov_state_codes(text, case_sensitive=True):
     return rs
 
 
+COUNTRY_PUNC = ",.;:-_/?!@&%()[]{}"
+_country_name_index = None
+
+
+def country_name_index():
+    """Returns an index of COUNTRY_NAME keyed by the first word of each name.
+    Each entry is a list of (words, name) tuples ordered longest name first so
+    that multi-word names can be matched greedily.  Words are stored with
+    surrounding punctuation removed.  The index is built once on first use."""
+    global _country_name_index
+    if _country_name_index is None:
+        index = {}
+        for name in COUNTRY_NAME:
+            words = tuple(w.strip(COUNTRY_PUNC) for w in name.split())
+            index.setdefault(words[0], []).append((words, name))
+        for entries in index.values():
+            entries.sort(key=lambda e: len(e[0]), reverse=True)
+        _country_name_index = index
+    return _country_name_index
+
+
+def _word_spans(text):
+    """Returns a list of (start, end, word) for each whitespace delimited word
+    with surrounding punctuation excluded from the span."""
+    spans = []
+    for m in re.finditer(r"\S+", text):
+        word = m.group(0)
+        core = word.strip(COUNTRY_PUNC)
+        if len(core) == 0:
+            continue
+        start = m.start() + len(word) - len(word.lstrip(COUNTRY_PUNC))
+        spans.append((start, start + len(core), core))
+    return spans
+
+
+def _replace_spans(text, spans):
+    """Builds a new string from text with each (start, end, new_text) span
+    substituted.  Spans must be in order and not overlap."""
+    s = []
+    idx = 0
+    for start, end, new_text in spans:
+        s.append(text[idx:start])
+        s.append(new_text)
+        idx = end
+    s.append(text[idx:])
+    return "".join(s)
+
+
+def find_country_names(text):
+    """Finds country names in text in a single forward pass.
+    Returns a list of (start, end, name, code) spans.  Multi-word names are
+    matched greedily (longest name first) and single word names can also
+    match in title case, e.g. "canada"."""
+    text = str(text)
+    index = country_name_index()
+    words = _word_spans(text)
+    nwords = len(words)
+    spans = []
+    i = 0
+    while i < nwords:
+        start, end, core = words[i]
+        found = None
+        for entry_words, name in index.get(core, []):
+            n = len(entry_words)
+            if i + n > nwords:
+                continue
+            if all(words[i + j][2] == entry_words[j] for j in range(1, n)):
+                found = (n, name)
+                break
+        if found is None:
+            title = core.title()
+            if title in COUNTRY_NAME:
+                found = (1, title)
+        if found is not None:
+            n, name = found
+            spans.append((start, words[i + n - 1][1], name, COUNTRY_NAME[name]))
+            i += n
+        else:
+            i += 1
+    return spans
+
+
+def find_country_codes(text):
+    """Finds country 2-letter ISO codes in text in a single forward pass.
+    Returns a list of (start, end, code, name) spans."""
+    text = str(text)
+    spans = []
+    for m in re.finditer(r"\S+", text):
+        code = m.group(0)
+        if code in COUNTRY_DB:
+            spans.append((m.start(), m.end(), code, COUNTRY_DB[code]))
+    return spans
+
+
 def replace_country_names(text):
     """Replaces any instances of country names with 2-letter ISO code"""
     text = str(text)
-    rs = text
-    ts = text.split()
-    for t in ts:
-        tc = strip_punc(t)
-        if tc in COUNTRY_NAME:
-            country_code = COUNTRY_NAME[tc]
-        elif tc.title() in COUNTRY_NAME:
-            country_code = COUNTRY_NAME[tc.title()]
-        else:
-            continue
-        if country_code is not None:
-            rs = rs.replace(tc, country_code)
-    for ng in [2, 3, 4]:
-        ngs = n_grams(rs, ng, as_list=False)
-        for n in ngs:
-            tc = strip_punc(n)
-            if tc in COUNTRY_NAME:
-                country_code = COUNTRY_NAME[tc]
-            else:
-                continue
-            if country_code is not None:
-                rs = rs.replace(tc, country_code)
-    return rs
+    spans = find_country_names(text)
+    return _replace_spans(text, [(s, e, code) for s, e, _, code in spans])
 
 
 def replace_country_codes(text):
     """Replaces any instances of country 2-letter ISO codes with names"""
     text = str(text)
-    rs = text
-    ts = text.split()
-    for t in ts:
-        if t in COUNTRY_DB:
-            country_code = COUNTRY_DB[t]
-        else:
-            continue
-        if country_code is not None:
-            rs = rs.replace(t, country_code)
-    return rs
+    spans = find_country_codes(text)
+    return _replace_spans(text, [(s, e, name) for s, e, _, name in spans])
 
 
-def word_freq(words, only_words=False):
-    """Computes the frequency distributions of a provided word list.
-    Returns a list of word/freq pairs.  Returns just the sorted
-    word list if only_words is True."""
-    dist = nltk.FreqDist(words)
-    common = dist.most_common()
-    word_dist = list(
-        itertools.chain(
-            *(sorted(ys) for _, ys in itertools.groupby(common, key=lambda t: t[1]))
-        )
-    )
+def _word_freq_key(item):
+    return -item[1], item[0]
+
+
+def word_freq(words, only_words=False, up_to=0):
+    """Computes the frequency distributions of a provided word list
+    or a Counter of words which has already been counted.
+    Returns a list of word/freq pairs sorted by descending frequency and
+    then by word.  Returns just the sorted word list if only_words is True.
+    If up_to is specified, only the up_to most frequent words are returned."""
+    counts = words if isinstance(words, Counter) else Counter(words)
+    if up_to > 0:
+        word_dist = heapq.nsmallest(up_to, counts.items(), key=_word_freq_key)
+    else:
+        word_dist = sorted(counts.items(), key=_word_freq_key)
     if only_words:
         return [w[0] for w in word_dist]
     return word_dist
@@ -794,9 +1079,7 @@ def word_freq(words, only_words=False):
 def word_freq_str(words, min_count=0, up_to=0, style="flat"):
     """Returns a string showing word frequency in descending order."""
     s = []
-    word_dist = word_freq(words)
-    limit = up_to if up_to > 0 else len(words)
-    for word in word_dist[:limit]:
+    for word in word_freq(words, up_to=up_to):
         if word[1] >= min_count:
             if style == "flat":
                 s.append("%dx: %s " % (word[1], word[0]))
@@ -852,25 +1135,246 @@ def hsv_to_rgb(hsv, as_float=False):
     return safe_colour_tuple(rgb, as_float=as_float)
 
 
+HEX_BYTE_STRS = tuple("%02X" % i for i in range(256))
+
+
+def safe_colour_array(colours, as_float=True):
+    """Returns an Nx3 array of RGB colours from a list of colours of any type
+    accepted by safe_colour_tuple. Numeric arrays are scaled row by row in a
+    single vectorized pass, otherwise each distinct colour is converted once.
+    The array is float 0.0 to 1.0 or uint8 depending on as_float."""
+    arr = colours
+    if not isinstance(arr, np.ndarray):
+        try:
+            arr = np.asarray(colours)
+        except ValueError:
+            arr = None
+    if arr is not None and arr.dtype.kind in "uif" and arr.shape[-1:] == (3,):
+        arr = arr.reshape(-1, 3).astype(np.float64)
+        over = np.any(arr > 1, axis=1)
+        if as_float:
+            arr[over] /= 255
+            return arr
+        arr[~over] = np.floor(np.minimum(255, arr[~over] * 256))
+        return np.clip(arr, 0, 255).astype(np.uint8)
+    converted = {}
+    rows = []
+    for colour in colours:
+        key = tuple(colour) if isinstance(colour, (list, np.ndarray)) else colour
+        if key not in converted:
+            converted[key] = safe_colour_tuple(colour, as_float=as_float)[:3]
+        rows.append(converted[key])
+    if as_float:
+        return np.array(rows, dtype=np.float64).reshape(-1, 3)
+    arr = np.array(rows, dtype=np.float64).reshape(-1, 3)
+    return np.clip(arr, 0, 255).astype(np.uint8)
+
+
+def rgb_from_hex_array(hexcodes, as_uint8=False):
+    """Returns an Nx3 array of RGB colours from a list of hex code strings.
+    Each distinct hex code is only parsed once."""
+    parsed = {}
+    rows = []
+    for h in hexcodes:
+        if h not in parsed:
+            parsed[h] = rgb_from_hex(h, as_uint8=True)
+        rows.append(parsed[h])
+    arr = np.array(rows, dtype=np.uint8).reshape(-1, 3)
+    if as_uint8:
+        return arr
+    return arr / 255.0
+
+
+def rgb_to_hex_array(colours):
+    """Returns a list of hex RGB strings from an Nx3 array of RGB colours.
+    Like rgb_to_hex, each row is treated as 0 to 255 if any component is
+    greater than 1, otherwise as 0.0 to 1.0."""
+    arr = np.asarray(colours, dtype=np.float64).reshape(-1, 3)
+    over = np.any(arr > 1, axis=1, keepdims=True)
+    vals = np.trunc(np.where(over, arr, arr * 255)).astype(np.int64)
+    if np.any(vals < 0) or np.any(vals > 255):
+        return ["#%02X%02X%02X" % tuple(v) for v in vals]
+    strs = np.array(HEX_BYTE_STRS)[vals]
+    return ["#" + r + g + b for r, g, b in zip(strs[:, 0], strs[:, 1], strs[:, 2])]
+
+
+def rgb_to_hsv_array(colours):
+    """Converts an Nx3 array (or list) of RGB colours to an Nx3 uint8 array
+    of HSV colours with a single cv2.cvtColor call."""
+    rgb = safe_colour_array(colours, as_float=False)
+    hsv = cv2.cvtColor(np.ascontiguousarray(rgb.reshape(1, -1, 3)), cv2.COLOR_RGB2HSV)
+    return hsv.reshape(-1, 3)
+
+
+HSV_SECTORS = ((0, 3, 1), (2, 0, 1), (1, 0, 3), (1, 2, 0), (3, 1, 0), (0, 1, 2))
+
+
+def hsv_to_rgb_array(hsv, as_float=False):
+    """Converts an Nx3 array of 8-bit HSV colours to an Nx3 array of RGB colours.
+    The conversion is computed with numpy using the same float32 arithmetic
+    as the per-pixel cv2.cvtColor path so that results match hsv_to_rgb
+    (the vectorized cvtColor path can differ by one level).
+    RGB can be scaled as 8-bit ints or floating point 0.0 to 1.0."""
+    c = np.asarray(hsv, dtype=np.uint8).reshape(-1, 3).astype(np.float32)
+    h = c[:, 0] * np.float32(6.0 / 180.0)
+    s = c[:, 1] * np.float32(1.0 / 255.0)
+    v = c[:, 2] * np.float32(1.0 / 255.0)
+    h = np.fmod(h, np.float32(6.0))
+    sector = np.floor(h)
+    h = (h - sector).astype(np.float32)
+    # 1 - s * x is evaluated in double and rounded once, as with a fused multiply-add
+    s, hf, hr = s.astype(np.float64), h.astype(np.float64), (1 - h).astype(np.float64)
+    scales = np.stack((np.ones_like(s), 1 - s, 1 - s * hf, 1 - s * hr), axis=1)
+    tab = v[:, np.newaxis] * scales.astype(np.float32)
+    rgb = np.take_along_axis(tab, np.array(HSV_SECTORS)[sector.astype(np.intp)], axis=1)
+    rgb[s == 0] = v[s == 0, np.newaxis]
+    rgb = np.clip(np.rint(rgb * np.float32(255.0)), 0, 255).astype(np.uint8)
+    return safe_colour_array(rgb, as_float=as_float)
+
+
+class ColourIndex:
+    """A precomputed index of named colours for fast colour name lookups.
+    Exact matches are found with a dictionary keyed by RGB tuple and the
+    nearest named colour is found with a vectorized numpy argmin over the
+    array of all named colour RGB values."""
+
+    CHUNK_SIZE = 1024
+
+    def __init__(self, colours):
+        self.names = list(colours.keys())
+        self.rgb = np.array(list(colours.values()), dtype=np.float64)
+        self.exact = {}
+        for k, v in colours.items():
+            self.exact.setdefault(tuple(v), k)
+
+    def nearest_indices(self, colours):
+        """Returns the index of the nearest named colour for each RGB row in
+        an Nx3 array.  Ties resolve to the first name in the index."""
+        colours = np.asarray(colours, dtype=np.float64).reshape(-1, 3)
+        indices = np.empty(len(colours), dtype=np.intp)
+        for i in range(0, len(colours), self.CHUNK_SIZE):
+            chunk = colours[i : i + self.CHUNK_SIZE]
+            diff = chunk[:, np.newaxis, :] - self.rgb[np.newaxis, :, :]
+            dist = np.sqrt(np.sum(diff * diff, axis=2))
+            indices[i : i + self.CHUNK_SIZE] = np.argmin(dist, axis=1)
+        return indices
+
+    def name(self, colour):
+        """Returns the name of a colour tuple, either an exact or nearest match."""
+        val = tuple(colour)
+        if val in self.exact:
+            return self.exact[val]
+        return self.names[self.nearest_indices([val[:3]])[0]]
+
+    def names_from_array(self, colours):
+        """Returns a list of the nearest colour names for an Nx3 RGB array."""
+        return [self.names[i] for i in self.nearest_indices(colours)]
+
+
+_named_colour_index = None
+
+
+def named_colour_index():
+    """Returns the ColourIndex of NAMED_COLOURS, built on first use."""
+    global _named_colour_index
+    if _named_colour_index is None:
+        _named_colour_index = ColourIndex(NAMED_COLOURS)
+    return _named_colour_index
+
+
 def colour_name_from_tuple(colour):
     """Returns a standard colour name from a RGB colour tuple."""
     if not isinstance(colour, (list, tuple)):
         return None
-    val = tuple(colour)
-    for k, v in NAMED_COLOURS.items():
-        if v == val:
-            return k
-    # find nearest match
-    min_key = ""
-    min_diff = 1e9
-    for k, v in NAMED_COLOURS.items():
-        diff = math.sqrt(
-            (val[0] - v[0]) ** 2 + (val[1] - v[1]) ** 2 + (val[2] - v[2]) ** 2
+    return named_colour_index().name(colour)
+
+
+def colour_names_from_array(colours):
+    """Returns a list of standard colour names from an Nx3 array of RGB colours."""
+    return named_colour_index().names_from_array(colours)
+
+
+class LDrawPalette:
+    """A precomputed palette of LDraw colours.
+    RGB (uint8 and float) and HSV values for every LDraw colour code are
+    stored in numpy lookup arrays indexed directly by code so that any number
+    of codes can be converted with a single fancy index. Unknown codes map
+    to black. Nearest LDraw colours are found with a ColourIndex.
+    The HSV table (which needs OpenCV) and the ColourIndex are only built
+    when first used so that RGB lookups stay cheap."""
+
+    def __init__(self, colours=None):
+        colours = colours if colours is not None else LDRAW_COLOURS
+        self.codes = np.array(sorted(colours.keys()), dtype=np.intp)
+        size = int(self.codes[-1]) + 1 if len(self.codes) else 1
+        self.valid = np.zeros(size, dtype=bool)
+        self.valid[self.codes] = True
+        self.rgb = np.zeros((size, 3), dtype=np.uint8)
+        self.rgb[self.codes] = rgb_from_hex_array(
+            [colours[c] for c in self.codes], as_uint8=True
         )
-        if diff < min_diff:
-            min_diff = diff
-            min_key = k
-    return min_key
+        self.rgb_float = self.rgb / 255.0
+
+    @cached_property
+    def hsv(self):
+        return rgb_to_hsv_array(self.rgb)
+
+    @cached_property
+    def index(self):
+        return ColourIndex({int(c): tuple(self.rgb[c].tolist()) for c in self.codes})
+
+    def _indices(self, codes):
+        codes = np.asarray(codes).astype(np.intp)
+        inside = (codes >= 0) & (codes < len(self.valid))
+        codes = np.where(inside, codes, 0)
+        return np.where(inside & self.valid[codes], codes, -1)
+
+    def _lookup(self, table, codes):
+        idx = self._indices(codes)
+        values = table[np.maximum(idx, 0)]
+        values[idx < 0] = 0
+        return values
+
+    def __contains__(self, code):
+        return 0 <= int(code) < len(self.valid) and bool(self.valid[int(code)])
+
+    def __len__(self):
+        return len(self.codes)
+
+    def colour(self, code, as_float=True):
+        """Returns the RGB colour tuple of a single LDraw colour code."""
+        if code not in self:
+            return (0, 0, 0)
+        table = self.rgb_float if as_float else self.rgb
+        return tuple(table[int(code)].tolist())
+
+    def rgb_from_codes(self, codes, as_float=True):
+        """Returns an Nx3 array of RGB colours for an array of LDraw codes."""
+        return self._lookup(self.rgb_float if as_float else self.rgb, codes)
+
+    def hsv_from_codes(self, codes):
+        """Returns an Nx3 uint8 array of HSV colours for an array of LDraw codes."""
+        return self._lookup(self.hsv, codes)
+
+    def nearest_code(self, colour):
+        """Returns the LDraw code of the nearest colour to any type of colour."""
+        return self.index.name(safe_colour_tuple(colour, as_float=False))
+
+    def nearest_codes(self, colours):
+        """Returns an array of the nearest LDraw codes for a list of colours."""
+        rgb = safe_colour_array(colours, as_float=False)
+        return self.codes[self.index.nearest_indices(rgb)]
+
+
+_ldraw_palette = None
+
+
+def ldraw_palette():
+    """Returns the LDrawPalette of LDRAW_COLOURS, built on first use."""
+    global _ldraw_palette
+    if _ldraw_palette is None:
+        _ldraw_palette = LDrawPalette()
+    return _ldraw_palette
 
 
 def colour_name_from_hex(hexcode):
@@ -914,7 +1418,10 @@ def safe_colour_tuple(colour, as_float=True):
     elif isinstance(colour, (int, float)):
         c = int(colour)
         if c in LDRAW_COLOURS:
-            return rgb_from_hex(LDRAW_COLOURS[c], as_uint8=not as_float)
+            # a single lookup is not worth building the palette (and numpy)
+            if _ldraw_palette is None:
+                return rgb_from_hex(LDRAW_COLOURS[c], as_uint8=not as_float)
+            return _ldraw_palette.colour(c, as_float=as_float)
     return (0, 0, 0)
 
 
@@ -959,3 +1466,39 @@ def eng_units(val, units="", prefix="", sigfigs=None, unitsep=True, unitary=Fals
             break
     s = s.replace("_", "")
     return s
+
+
+ENG_UNITS_MAGS = (18, 15, 12, 9, 6, 3, 0, -3, -6, -9, -12, -15, -18)
+ENG_UNITS_MODS = ("E", "P", "T", "G", "M", "k", "", "m", "u", "n", "p", "f", "a")
+
+
+def eng_units_array(
+    values, units="", prefix="", sigfigs=None, unitsep=True, unitary=False
+):
+    """Returns an array of strings of numeric values in engineering units.
+    This is a batch equivalent of eng_units. The magnitude of every value is
+    found with a single sorted search of the powers of 10 and each formatting
+    step is applied to the whole array at once."""
+    vals = np.asarray(values, dtype=np.float64).ravel()
+    sign = np.where(vals < 0, "-", "")
+    vals = np.abs(vals)
+    ndig = 6 if sigfigs is None else sigfigs + 1
+    ndig = max(min(ndig, 7), 2)
+    # ascending powers of 10 so that the number of powers strictly less
+    # than a value identifies its magnitude, as with val > 10**mag
+    powers = np.array([10**m for m in reversed(ENG_UNITS_MAGS)], dtype=np.float64)
+    idx = np.searchsorted(powers, vals, side="left") - 1
+    valid = (idx >= 0) & ~np.isnan(vals)
+    idx = np.maximum(idx, 0)
+    mags = len(ENG_UNITS_MAGS) - 1 - idx
+    s = np.char.mod("%.3f", vals / powers[idx]).astype("<U%d" % (ndig))
+    s = np.char.rstrip(s, "0")
+    s = np.where(np.char.endswith(s, "."), np.char.add(s, "0"), s)
+    if unitary:
+        whole = (mags == ENG_UNITS_MAGS.index(0)) & np.char.endswith(s, ".0")
+        s = np.where(whole, np.char.partition(s, ".")[..., 0], s)
+    mods = np.array(ENG_UNITS_MODS)[mags]
+    tail = np.char.add(" " if unitsep else "", mods)
+    s = np.char.add(np.char.add(sign, s), np.char.add(tail, units))
+    s = np.where(valid, np.char.add(prefix, s), "")
+    return np.char.replace(s, "_", "")
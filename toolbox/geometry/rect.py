@@ -27,7 +27,6 @@ import math
 import copy
 
 from .point import Point
-from toolbox.datautils import clamp_value
 from toolbox.imageutils import ImageMixin
 
 
@@ -568,6 +567,8 @@ class Rect:
         """Maps a point from our rect into another corresponding rect."""
         x, y = self._xy_from_pt(pt)
         if clamp_bounds:
+            from toolbox.datautils import clamp_value
+
             x = clamp_value(x, self.left, self.right)
             y = clamp_value(y, self.bottom, self.top, auto_limit=True)
         xr = (x - self.left) / self.width
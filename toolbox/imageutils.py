@@ -24,11 +24,12 @@
 # Image Processing Utilities
 #
 
-import cv2
 import math
-import numpy as np
 
-from .datautils import clamp_value
+from .lazyimport import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
 
 
 class ImageMixin:
@@ -151,6 +152,8 @@ class ImageMixin:
     def crop_to_content(img, bg=None, tol=4, widthwise=True, heightwise=True):
         """Crops an image to the bounding box of content using either
         a provided background colour or the top left pixel colour."""
+        from .datautils import clamp_value
+
         img = ImageMixin.auto_open(img)
         thr = bg if bg is not None else img[0, 0]
         thr_l = tuple(int(clamp_value(thr[i] - tol, 0, 255)) for i in range(3))
@@ -0,0 +1,252 @@
+#! /usr/bin/env python3
+#
+# Copyright (C) 2023  Michael Gale
+
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Opt-in instrumentation of hot paths
+#
+
+import functools
+import importlib
+import sys
+import threading
+import time
+
+# Default instrumented entry points as (module, qualified name). A qualified
+# name of "Class.*" instruments all of the public methods of a class.
+INSTRUMENTED = (
+    ("toolbox.textproc", "TextProc.__init__"),
+    ("toolbox.textproc", "TextProc.get_dates"),
+    ("toolbox.datautils", "get_dates_from_text"),
+    ("toolbox.geometry.layout", "RectLayout.optimize_layout"),
+    ("toolbox.files", "FileOps.*"),
+    ("toolbox.imageutils", "ImageMixin.*"),
+)
+
+
+class CallStats:
+    """Call count and cumulative and maximum latency (in seconds) of a function."""
+
+    __slots__ = ("name", "count", "total", "max")
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def __str__(self):
+        return "%-40s calls: %8d total: %10.3f ms mean: %10.3f ms max: %10.3f ms" % (
+            self.name,
+            self.count,
+            1000 * self.total,
+            1000 * self.mean,
+            1000 * self.max,
+        )
+
+    def add(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.mean,
+            "max": self.max,
+        }
+
+
+_call_stats = {}
+_patches = []
+_enabled = set()
+_dump_timer = None
+
+
+def instrumented(name):
+    """Decorator which wraps a module level function once at definition time
+    so that every reference to it, including copies made by star imports, is
+    timed while instrumentation is enabled for name. When disabled the wrapper
+    only checks a set membership before calling the function."""
+
+    def decorator(func):
+        stats = _call_stats.setdefault(name, CallStats(name))
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if name not in _enabled:
+                return func(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.add(time.perf_counter() - t0)
+
+        wrapper.__instrumented_name__ = name
+        return wrapper
+
+    return decorator
+
+
+def _timed(func, name):
+    stats = _call_stats.setdefault(name, CallStats(name))
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.add(time.perf_counter() - t0)
+
+    wrapper.__instrumented__ = func
+    return wrapper
+
+
+def _patch(owner, attr, value):
+    _patches.append((owner, attr, owner.__dict__[attr]))
+    setattr(owner, attr, value)
+
+
+def _instrument_method(cls, attr, name):
+    raw = cls.__dict__[attr]
+    if isinstance(raw, staticmethod):
+        _patch(cls, attr, staticmethod(_timed(raw.__func__, name)))
+    elif isinstance(raw, classmethod):
+        _patch(cls, attr, classmethod(_timed(raw.__func__, name)))
+    elif callable(raw):
+        _patch(cls, attr, _timed(raw, name))
+
+
+def _instrument_function(module, attr, name):
+    func = getattr(module, attr)
+    if hasattr(func, "__instrumented_name__"):
+        _enabled.add(func.__instrumented_name__)
+        return
+    # functions not decorated with instrumented are patched in the toolbox
+    # modules only, references held elsewhere are not timed
+    wrapper = _timed(func, name)
+    # resolve lazily exported names in the package first so they are patched too
+    getattr(sys.modules.get("toolbox"), attr, None)
+    # replace every reference, including copies made by star imports
+    for modname, mod in list(sys.modules.items()):
+        if modname == "toolbox" or modname.startswith("toolbox."):
+            if mod.__dict__.get(attr) is func:
+                _patch(mod, attr, wrapper)
+
+
+def enable_instrumentation(targets=None):
+    """Enables timing of hot path entry points. targets is an optional list of
+    (module, qualified name) tuples which defaults to INSTRUMENTED.
+    Methods are patched on their class and functions decorated with
+    instrumented are switched on, so both are timed however they are
+    referenced. Other module level functions are only replaced inside the
+    toolbox modules, so copies imported elsewhere beforehand are not timed."""
+    if instrumentation_enabled():
+        disable_instrumentation()
+    for modname, qualname in targets if targets is not None else INSTRUMENTED:
+        module = importlib.import_module(modname)
+        if "." not in qualname:
+            _instrument_function(module, qualname, qualname)
+            continue
+        clsname, attr = qualname.split(".", 1)
+        cls = getattr(module, clsname)
+        if attr != "*":
+            _instrument_method(cls, attr, qualname)
+            continue
+        for k in list(cls.__dict__):
+            if not k.startswith("_"):
+                _instrument_method(cls, k, "%s.%s" % (clsname, k))
+
+
+def disable_instrumentation():
+    """Disables instrumentation and restores the original functions.
+    Collected statistics are kept until reset_call_stats is called."""
+    _enabled.clear()
+    while _patches:
+        owner, attr, value = _patches.pop()
+        setattr(owner, attr, value)
+
+
+def instrumentation_enabled():
+    return len(_patches) > 0 or len(_enabled) > 0
+
+
+def call_stats():
+    """Returns a dictionary of CallStats keyed by instrumented function name
+    for every function which has been called."""
+    return {k: v for k, v in _call_stats.items() if v.count}
+
+
+def reset_call_stats():
+    for v in _call_stats.values():
+        v.count, v.total, v.max = 0, 0.0, 0.0
+
+
+def call_stats_str(sort_by="total"):
+    """Returns a table of call statistics, one instrumented function per line
+    sorted by total, mean, max or count in descending order."""
+    stats = sorted(
+        call_stats().values(), key=lambda s: getattr(s, sort_by), reverse=True
+    )
+    return "\n".join(str(s) for s in stats)
+
+
+def dump_call_stats(sort_by="total", **kwargs):
+    """Logs the call statistics with logmsg. kwargs are passed to logmsg,
+    e.g. level, log_output and log_level. By default every line is logged."""
+    from .niceprint import logmsg
+
+    kwargs.setdefault("prefix", "timing")
+    kwargs.setdefault("level", 0)
+    for line in call_stats_str(sort_by=sort_by).splitlines():
+        logmsg(line, **kwargs)
+
+
+def start_call_stats_dump(interval, sort_by="total", **kwargs):
+    """Periodically logs the call statistics every interval seconds on a
+    background thread until stop_call_stats_dump is called."""
+    global _dump_timer
+
+    def dump():
+        global _dump_timer
+        dump_call_stats(sort_by=sort_by, **kwargs)
+        _dump_timer = threading.Timer(interval, dump)
+        _dump_timer.daemon = True
+        _dump_timer.start()
+
+    stop_call_stats_dump()
+    _dump_timer = threading.Timer(interval, dump)
+    _dump_timer.daemon = True
+    _dump_timer.start()
+
+
+def stop_call_stats_dump():
+    global _dump_timer
+    if _dump_timer is not None:
+        _dump_timer.cancel()
+        _dump_timer = None
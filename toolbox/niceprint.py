@@ -31,6 +31,9 @@ import crayons
 
 from .datautils import get_numbers, get_email_addresses, replace_prov_state_codes
 from .constants import EMOJI_COUNTRY_CODE_DICT
+from .lazyimport import lazy_import
+
+np = lazy_import("numpy")
 
 colour_gradient = (
     (5e9, crayons.red, False),
@@ -78,6 +81,51 @@ def file_size_str(size, style=None):
         return crayons.white("%10s" % (s))
 
 
+FILE_SIZE_UNITS = (
+    (1e9, "%.2f GB"),
+    (1e6, "%.2f MB"),
+    (1e3, "%.2f kB"),
+    (0, "%.0f bytes"),
+)
+
+
+def _crayon_affixes(colour, bold):
+    """Returns the (prefix, suffix) strings which a crayons colour adds to text."""
+    return tuple(str(colour("\0", bold=bold)).split("\0"))
+
+
+def file_size_str_array(sizes, style=None):
+    """Returns an array of file size strings in human readable units.
+    This is a batch equivalent of file_size_str for rendering large tables.
+    Units are assigned to every size with one sorted search, each unit is
+    formatted in a single pass and colour styling is applied per gradient
+    bucket rather than per value."""
+    sizes = np.asarray(sizes, dtype=np.float64).ravel()
+    # NaN compares false with every threshold like 0 bytes in file_size_str
+    # but would be sorted after all of the thresholds
+    nan = np.isnan(sizes)
+    s = np.full(sizes.shape, "0 bytes", dtype=object)
+    unit = np.searchsorted([thr for thr, _ in reversed(FILE_SIZE_UNITS)], sizes)
+    unit[nan] = 0
+    for i, (thr, fmt) in enumerate(reversed(FILE_SIZE_UNITS)):
+        mask = unit == i + 1
+        if np.any(mask):
+            s[mask] = np.char.mod(fmt, sizes[mask] / max(thr, 1))
+    s = s.astype(str)
+    padded = np.char.rjust(s, 10)
+    if style is None:
+        pre, post = _crayon_affixes(crayons.white, False)
+        return np.char.add(np.char.add(pre, padded), post)
+    gradient = colour_gradient if style == "colour" else mono_gradient
+    bucket = len(gradient) - np.searchsorted([g[0] for g in reversed(gradient)], sizes)
+    bucket[nan] = len(gradient)
+    affixes = [_crayon_affixes(c, b) for _, c, b in gradient] + [("", "")]
+    pre = np.array([a[0] for a in affixes])[bucket]
+    post = np.array([a[1] for a in affixes])[bucket]
+    text = np.where(bucket < len(gradient), padded, s)
+    return np.char.add(np.char.add(pre, text), post)
+
+
 def _full_path(file):
     """Returns the fully expanded path of a file"""
     if "~" in file:
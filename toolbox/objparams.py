@@ -25,13 +25,19 @@
 # "dotted" accesible properties for a class
 #
 
+import hashlib
+import os
+import pickle
 import re
 import yaml
 import inspect
 import itertools as it
+import operator as op
+import weakref
 from collections import OrderedDict
-from metayaml import read
-
+from functools import lru_cache
+from glob import glob
+from metayaml import read, MetaYaml
 
 # Dictionary processing based on 3b1b's manim library
 #
@@ -64,20 +70,82 @@ def apply_params(obj, kwargs, caller_locals={}):
     as an attribute of the object.
     """
 
-    # Assemble list of PROPERTIES from all super classes
-    classes_in_hierarchy = [obj.__class__]
-    static_configs = []
+    # Order matters a lot here, first dicts have higher priority
+    static_params, fresh = class_params(obj.__class__)
+    if fresh:
+        static_params = _copy_fresh_dicts(static_params, fresh)
+    caller_locals = filtered_locals(caller_locals)
+    obj.__dict__ = merge_dicts_recursively(
+        static_params, obj.__dict__, caller_locals, kwargs
+    )
+
+
+# Merged static PARAMS per class, see class_params
+_class_params_cache = weakref.WeakKeyDictionary()
+
+
+def _hierarchy_params(Class):
+    """Returns the classes in the hierarchy of Class with their PARAMS dict"""
+    classes_in_hierarchy = [Class]
+    hierarchy = []
     while len(classes_in_hierarchy) > 0:
         Class = classes_in_hierarchy.pop()
         classes_in_hierarchy += Class.__bases__
-        if hasattr(Class, "PARAMS"):
-            static_configs.append(Class.PARAMS)
+        hierarchy.append((Class, Class.__bases__, getattr(Class, "PARAMS", None)))
+    return hierarchy
 
-    # Order matters a lot here, first dicts have higher priority
-    caller_locals = filtered_locals(caller_locals)
-    all_dicts = [kwargs, caller_locals, obj.__dict__]
-    all_dicts += static_configs
-    obj.__dict__ = merge_dicts_recursively(*reversed(all_dicts))
+
+def _dict_ids(d, ids):
+    ids.add(id(d))
+    for value in d.values():
+        if isinstance(value, dict):
+            _dict_ids(value, ids)
+    return ids
+
+
+def _copy_fresh_dicts(d, fresh):
+    return {
+        k: _copy_fresh_dicts(v, fresh) if isinstance(v, dict) and id(v) in fresh else v
+        for k, v in d.items()
+    }
+
+
+def class_params(Class):
+    """
+    Returns the merged PARAMS of a class and all its super classes
+    and the ids of the nested dicts created by the merge.  The result
+    is cached per class and rebuilt whenever a PARAMS attribute or
+    __bases__ in the hierarchy is reassigned.  PARAMS dicts modified
+    in place require a call to clear_class_params_cache.
+    """
+    entry = _class_params_cache.get(Class)
+    if entry is not None:
+        hierarchy, merged, fresh = entry
+        if all(
+            (Class if C is None else C).__bases__ is bases
+            and getattr(Class if C is None else C, "PARAMS", None) is params
+            for C, bases, params in hierarchy
+        ):
+            return merged, fresh
+    hierarchy = _hierarchy_params(Class)
+    static_configs = [params for _, _, params in hierarchy if params is not None]
+    merged = merge_dicts_recursively(*reversed(static_configs))
+    source_ids = set()
+    for params in static_configs:
+        _dict_ids(params, source_ids)
+    fresh = frozenset(_dict_ids(merged, set()) - source_ids - {id(merged)})
+    # the class itself is not kept so that the weak reference key can expire
+    hierarchy[0] = (None, *hierarchy[0][1:])
+    _class_params_cache[Class] = (hierarchy, merged, fresh)
+    return merged, fresh
+
+
+def clear_class_params_cache(Class=None):
+    """Clears the cached PARAMS of Class or of all classes"""
+    if Class is None:
+        _class_params_cache.clear()
+    else:
+        _class_params_cache.pop(Class, None)
 
 
 def merge_dicts_recursively(*dicts):
@@ -116,23 +184,33 @@ def digest_locals(obj, keys=None):
         setattr(obj, key, caller_locals[key])
 
 
-def convert_value_with_unit(s, baseunit="mm"):
-    """Handle conversion of number strings ending with "in", "mm", "studs" or "%".
-    If a baseunit is provided, force values for in or mm to that unit;
-    if not provided, return the float without scaling. Always return non-number
-    strings unchanged and percentages in their decimal form.
-    """
-    if not isinstance(s, str):
-        return s
-    match = re.search(r"([\d.]+)\s*(\S*)", s)
-    if match is None or match.group(2) not in [
-        "in",
-        "mm",
-        "%",
-        "studs",
-        "inch",
-        "pt",
-    ]:
+UNITS = ("in", "mm", "%", "studs", "inch", "pt")
+UNIT_ALIASES = {"inch": "in"}
+VALUE_UNIT_RE = re.compile(r"([\d.]+)\s*(\S*)")
+UNIT_CACHE_SIZE = 65536
+
+# Conversions keyed by (unit, baseunit) as a sequence of (operator, constant)
+# steps applied in order so that results are identical to chained arithmetic
+UNIT_CONVERSIONS = {
+    ("studs", "mm"): ((op.mul, 8.0),),
+    ("in", "mm"): ((op.mul, 25.4),),
+    ("pt", "mm"): ((op.mul, 25.4), (op.truediv, 72.0)),
+    ("mm", "studs"): ((op.truediv, 8.0),),
+    ("in", "studs"): ((op.mul, 25.4), (op.truediv, 8.0)),
+    ("pt", "studs"): ((op.truediv, 72.0), (op.mul, 25.4), (op.truediv, 8.0)),
+    ("mm", "in"): ((op.truediv, 25.4),),
+    ("studs", "in"): ((op.mul, 8.0), (op.truediv, 25.4)),
+    ("pt", "in"): ((op.truediv, 72.0),),
+    ("mm", "pt"): ((op.truediv, 25.4), (op.mul, 72.0)),
+    ("studs", "pt"): ((op.mul, 8.0), (op.truediv, 25.4), (op.mul, 72.0)),
+    ("in", "pt"): ((op.mul, 72.0),),
+}
+
+
+@lru_cache(maxsize=UNIT_CACHE_SIZE)
+def _convert_str_with_unit(s, baseunit):
+    match = VALUE_UNIT_RE.search(s)
+    if match is None or match.group(2) not in UNITS:
         return s
 
     val, unit = match.groups()
@@ -144,66 +222,308 @@ def convert_value_with_unit(s, baseunit="mm"):
     if baseunit is None:
         return val
 
-    if baseunit == "mm":
-        if unit == "studs":
-            return val * 8.0
-        elif unit == "in" or unit == "inch":
-            return val * 25.4
-        elif unit == "pt":
-            return val * 25.4 / 72.0
-    elif baseunit == "studs":
-        if unit == "mm":
-            return val / 8.0
-        elif unit == "in" or unit == "inch":
-            return val * 25.4 / 8.0
-        elif unit == "pt":
-            return val / 72.0 * 25.4 / 8.0
-    elif baseunit == "in" or baseunit == "inch":
-        if unit == "mm":
-            return val / 25.4
-        elif unit == "studs":
-            return val * 8.0 / 25.4
-        elif unit == "pt":
-            return val / 72.0
-    elif baseunit == "pt":
-        if unit == "mm":
-            return val / 25.4 * 72.0
-        elif unit == "studs":
-            return val * 8.0 / 25.4 * 72.0
-        elif unit == "in" or unit == "inch":
-            return val * 72.0
-
+    unit = UNIT_ALIASES.get(unit, unit)
+    baseunit = UNIT_ALIASES.get(baseunit, baseunit)
+    for fn, k in UNIT_CONVERSIONS.get((unit, baseunit), ()):
+        val = fn(val, k)
     return val
 
 
+def convert_value_with_unit(s, baseunit="mm"):
+    """Handle conversion of number strings ending with "in", "mm", "studs" or "%".
+    If a baseunit is provided, force values for in or mm to that unit;
+    if not provided, return the float without scaling. Always return non-number
+    strings unchanged and percentages in their decimal form.
+    Converted strings are cached since parameter files repeat the same values.
+    """
+    if not isinstance(s, str):
+        return s
+    return _convert_str_with_unit(s, baseunit)
+
+
+def convert_values(values, baseunit="mm"):
+    """Converts a list of values with convert_value_with_unit and returns a list
+    of the results. If values is a dict, a dict of converted values is returned."""
+    if isinstance(values, dict):
+        return {k: convert_value_with_unit(v, baseunit) for k, v in values.items()}
+    return [convert_value_with_unit(v, baseunit) for v in values]
+
+
+PARAMS_CACHE_ENV = "TOOLBOX_PARAMS_CACHE"
+PARAMS_CACHE_VERSION = 2
+
+
+def params_cache_dir(cache=None):
+    """Returns the directory used to cache parsed Params YAML files or None if
+    caching is disabled. cache can be a directory, True for the default
+    ~/.cache/toolbox/params directory, False to disable caching or None to use
+    the directory in the TOOLBOX_PARAMS_CACHE environment variable if set."""
+    if cache is False:
+        return None
+    if isinstance(cache, str):
+        return cache
+    path = os.environ.get(PARAMS_CACHE_ENV)
+    if path:
+        return path
+    if cache:
+        return os.path.join(os.path.expanduser("~"), ".cache", "toolbox", "params")
+    return None
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _params_cache_file(cache_dir, files, baseunit):
+    files = [os.path.abspath(f) for f in files]
+    key = repr((PARAMS_CACHE_VERSION, files, baseunit)).encode()
+    return os.path.join(cache_dir, hashlib.sha1(key).hexdigest() + ".pickle")
+
+
+class _GlobRecordingMetaYaml(MetaYaml):
+    """MetaYaml which records the files matched by each file name or glob
+    pattern of the yml argument and of extend entries."""
+
+    def __init__(self, *args, **kwargs):
+        self.globbed = {}
+        super().__init__(*args, **kwargs)
+
+    def extend_filename(self, file_list, path=None):
+        files = []
+        for filename in file_list:
+            found = super().extend_filename([filename], path)
+            self.globbed[os.path.join(path or os.getcwd(), filename)] = found
+            files.extend(found)
+        return files
+
+
+def _read_params_cache(fn):
+    """Returns the cached tree of a Params YAML file set if the cache file exists,
+    every file name and glob pattern still matches the same files and none of
+    the files it was read from have changed. Files are compared by
+    modification time and size and then by content hash if these differ."""
+    try:
+        with open(fn, "rb") as f:
+            entry = pickle.load(f)
+        for pattern, matches in entry["globs"].items():
+            if sorted(glob(pattern)) != matches:
+                return None
+        for path, (mtime, size, digest) in entry["files"].items():
+            if _file_signature(path) != (mtime, size) and _file_hash(path) != digest:
+                return None
+        return entry["tree"]
+    except Exception:
+        # a missing, stale or unreadable cache is simply rebuilt
+        return None
+
+
+def _write_params_cache(fn, included, tree):
+    files, globs = included
+    entry = {
+        "files": {f: _file_signature(f) + (_file_hash(f),) for f in files},
+        "globs": globs,
+        "tree": tree,
+    }
+    os.makedirs(os.path.dirname(fn), exist_ok=True)
+    tmp = "%s.%d.tmp" % (fn, os.getpid())
+    with open(tmp, "wb") as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, fn)
+
+
+def _params_tree(obj):
+    """Returns a Params object as nested plain dictionaries."""
+    return {k: _params_tree(v) if isinstance(v, dict) else v for k, v in obj.items()}
+
+
+def _read_params_yml(yml, baseunit, cache):
+    """Returns the resolved tree of a YAML file (or list of files) either from
+    the on-disk cache or by parsing with metayaml. If the tree should be
+    written to the cache, the cache file name and the processed files with
+    the matches of every glob pattern are also returned, otherwise they are
+    None."""
+    files = yml if isinstance(yml, list) else [yml]
+    cache_dir = params_cache_dir(cache)
+    if cache_dir is not None:
+        cache_file = _params_cache_file(cache_dir, files, baseunit)
+        obj = _read_params_cache(cache_file)
+        if obj is not None:
+            return obj, None, None
+    if cache_dir is None:
+        return MetaYaml(files).data, None, None
+    m = _GlobRecordingMetaYaml(files)
+    return m.data, cache_file, (sorted(m.processed_files), m.globbed)
+
+
+def _try_write_params_cache(fn, included, tree):
+    try:
+        _write_params_cache(fn, included, tree)
+    except OSError:
+        pass
+
+
 class Params(dict):
     """A deserialization of a YAML file for . and [] access
     based on https://github.com/swolebro/caddyshack"""
 
+    def __new__(cls, *args, lazy=False, **kwargs):
+        if lazy and cls is Params:
+            cls = LazyParams
+        return super().__new__(cls)
+
     def __convert(self, s, baseunit="mm", **kwargs):
         return convert_value_with_unit(s, baseunit=baseunit)
 
-    def __init__(self, yml=None, *, obj=None, baseunit="mm", **kwargs):
+    def __init__(
+        self, yml=None, *, obj=None, baseunit="mm", cache=None, lazy=False, **kwargs
+    ):
         """Given a YAML file that's a toplevel list or dict,
         this turns it into nested Params all the way down.
 
+        The resolved tree of a YAML file set can be cached on disk (see
+        params_cache_dir) so that repeated loads skip YAML parsing entirely.
+        The cache is invalidated when the YAML file or any included file changes
+        or a file name or glob pattern matches different files.
+
+        If lazy is True, a LazyParams object is returned instead which
+        converts nested dicts and values with units on first access.
+
         The other args and kwargs are for internal use with recursion.
         """
 
         self.__dict__ = self
+        cache_file = None
         if yml is not None:
-            if isinstance(yml, list):
-                obj = read(yml)
-            else:
-                obj = read([yml])
-
-            kwargs = obj
+            obj, cache_file, included = _read_params_yml(yml, baseunit, cache)
 
         for k, v in list(obj.items()):
             if isinstance(v, str):
-                obj[k] = self.__convert(v, baseunit=baseunit, **kwargs)
+                obj[k] = self.__convert(v, baseunit=baseunit)
 
             if isinstance(v, dict):
-                obj[k] = Params(obj=v, baseunit=baseunit, **kwargs)
+                obj[k] = Params(obj=v, baseunit=baseunit)
 
         self.update(obj)
+        if cache_file is not None:
+            _try_write_params_cache(cache_file, included, _params_tree(self))
+
+
+class LazyParams(Params):
+    """Params which defer the work of Params until it is needed.
+    Nested dicts are wrapped as LazyParams and strings are unit converted on
+    the first attribute or item access of each key and the result is kept.
+    Loading a large parameter catalog therefore costs nothing up front and
+    memory grows only with the branches which are actually used.
+    Keys which have the same name as dict methods (e.g. items) must be
+    accessed with [] rather than as attributes.  Copies made with dict(),
+    {**params} or copy() and the __dict__ mapping convert the values just
+    like item access."""
+
+    _PRIVATE = ("_baseunit", "_resolved")
+
+    def __init__(
+        self, yml=None, *, obj=None, baseunit="mm", cache=None, lazy=True, **kwargs
+    ):
+        object.__setattr__(self, "_baseunit", baseunit)
+        object.__setattr__(self, "_resolved", set())
+        if yml is not None:
+            obj, cache_file, included = _read_params_yml(yml, baseunit, cache)
+            if cache_file is not None:
+                # the unconverted tree is cached since conversion is repeatable
+                _try_write_params_cache(cache_file, included, _params_tree(obj))
+        dict.update(self, obj)
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if key in self._resolved:
+            return value
+        if isinstance(value, dict) and not isinstance(value, Params):
+            value = LazyParams(obj=value, baseunit=self._baseunit)
+        elif isinstance(value, str):
+            value = convert_value_with_unit(value, baseunit=self._baseunit)
+        dict.__setitem__(self, key, value)
+        self._resolved.add(key)
+        return value
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self._resolved.add(key)
+
+    def __iter__(self):
+        # overriding __iter__ stops dict() and {**params} from copying the
+        # unconverted values directly, they use keys() and __getitem__ instead
+        return dict.__iter__(self)
+
+    @property
+    def __dict__(self):
+        return self
+
+    def __getattr__(self, name):
+        if name in LazyParams._PRIVATE or name.startswith("__"):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def __delattr__(self, name):
+        try:
+            del self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._resolved.discard(key)
+
+    def __eq__(self, other):
+        return dict.__eq__(self.resolve(), other)
+
+    __hash__ = None
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def values(self):
+        return [self[k] for k in self]
+
+    def copy(self):
+        return dict(self)
+
+    def items(self):
+        return [(k, self[k]) for k in self]
+
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        return dict.pop(self, key, *default)
+
+    def __reduce__(self):
+        return (
+            LazyParams._restore,
+            (dict(dict.items(self)), self._baseunit, set(self._resolved)),
+        )
+
+    @staticmethod
+    def _restore(obj, baseunit, resolved):
+        p = LazyParams(obj=obj, baseunit=baseunit)
+        p._resolved.update(resolved)
+        return p
+
+    def resolve(self):
+        """Converts every key so that no work is deferred. Nested LazyParams
+        are only resolved when they are compared or explicitly resolved."""
+        for k in self:
+            self[k]
+        return self
@@ -24,48 +24,273 @@
 #
 
 import copy
-import nltk
+import re
+from collections import Counter
 from string import punctuation
 from toolbox.datautils import *
 
+DATE_STAGES = ("lines", "tokens", "3-grams", "2-grams")
+
+
+STOPWORD_LANGUAGES = ("english", "french")
+_stopwords = {}
+
+
+def stopwords(languages=None):
+    """Returns a frozenset of the NLTK stopwords for one or more languages.
+    The stopword corpus for each combination of languages is only read once
+    and the same set is shared by all TextProc objects."""
+    languages = tuple(languages) if languages is not None else STOPWORD_LANGUAGES
+    if languages not in _stopwords:
+        import nltk
+
+        words = set()
+        for language in languages:
+            words.update(nltk.corpus.stopwords.words(language))
+        _stopwords[languages] = frozenset(words)
+    return _stopwords[languages]
+
+
+FILTER_PUNC = frozenset((*punctuation, "•", "»"))
+TOKEN_PUNC = "{ } [ ] ( ) | “ ” , • » ! ? * §"
+TOKEN_PUNC_TABLE = str.maketrans("", "", "".join(TOKEN_PUNC.split()))
+WORD_RE = re.compile(r"\S+")
+
+
+def _strip_token(word):
+    """Strips enclosing punctuation from a word in the same way as
+    strip_punc with TOKEN_PUNC and then ". - : ;" from both ends for words
+    without numbers.  Returns the stripped word and whether it has numbers."""
+    w = word.translate(TOKEN_PUNC_TABLE)
+    if HAS_NUMBER_RE.search(w) is not None:
+        return w, True
+    w = w.rstrip(".").rstrip("-").rstrip(":").rstrip(";")
+    w = w.lstrip(".").lstrip("-").lstrip(":").lstrip(";")
+    return w, False
+
+
+def filter_words(words, stopword_set, ignore_numbers=False):
+    """Filters stopwords and single punctuation characters out of a list of
+    words and strips enclosing punctuation from the remaining words.
+    Words containing numbers are also removed if ignore_numbers is True."""
+    s = []
+    for word in words:
+        if len(word) == 1 and word in FILTER_PUNC:
+            continue
+        if len(word) > 0 and word.lower() not in stopword_set:
+            w, numbers = _strip_token(word)
+            if not (ignore_numbers and numbers):
+                s.append(w)
+    return s
+
+
+def tokenize(text, stopword_set):
+    """Tokenizes text in a single pass, returning the same words as
+    filter_words with and without ignore_numbers at once.
+    Returns a tuple of (words, tokens, offsets) where words excludes words
+    containing numbers, tokens includes them and offsets is a list of
+    (start, end) positions in text of the word each token came from."""
+    words = []
+    tokens = []
+    offsets = []
+    for m in WORD_RE.finditer(text):
+        word = m.group(0)
+        if len(word) == 1 and word in FILTER_PUNC:
+            continue
+        if word.lower() in stopword_set:
+            continue
+        w, numbers = _strip_token(word)
+        if not numbers:
+            words.append(w)
+        tokens.append(w)
+        offsets.append(m.span())
+    return words, tokens, offsets
+
+
+def iso_date_str(date):
+    """Returns a date as an ISO formatted string without a midnight time."""
+    return date.isoformat(timespec="hours").replace("T00", "")
+
+
+def best_date_str(dates):
+    """Returns the most popular of a sorted list of dates as an ISO formatted
+    string.  If there is no clear winner, the most popular month is used."""
+    if len(dates) > 0:
+        best = most_popular(dates, ignore_outliers=False, ignore_no_winner=False)
+        if best is not None:
+            return iso_date_str(best)
+        new_dates = [str(d)[:7] for d in dates]
+        date_dict = {nd: d for nd, d in zip(new_dates, dates)}
+        best = most_popular(new_dates, ignore_outliers=False, ignore_no_winner=True)
+        return iso_date_str(date_dict[best])
+    return None
+
+
+ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+# Features of TextProc which are computed on first access
+TEXTPROC_FEATURES = (
+    "split_text",
+    "clean_lines",
+    "raw_words",
+    "words",
+    "word_counts",
+    "word_set",
+    "tokens",
+    "token_offsets",
+    "capitalized_words",
+    "uppercase_words",
+    "numbers",
+    "telephone_no",
+    "email_address",
+    "dates",
+)
+
+
+class TextStats:
+    """A compact, picklable summary of word, number and date counts from one
+    or more documents.  Summaries from different documents (or processes)
+    can be combined with merge or reduce to compute corpus level statistics
+    such as the top words or the best date."""
+
+    COUNTERS = ("words", "capitalized_words", "uppercase_words", "numbers", "dates")
+
+    def __init__(self, doc_count=0, word_count=0, **kwargs):
+        self.doc_count = doc_count
+        self.word_count = word_count
+        for name in TextStats.COUNTERS:
+            setattr(self, name, Counter(kwargs.get(name, {})))
+
+    def __str__(self):
+        return "Documents: %-5d Word count: %-5d Unique word count: %-5d" % (
+            self.doc_count,
+            self.word_count,
+            len(self.words),
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, TextStats):
+            return NotImplemented
+        return self.__dict__ == other.__dict__
+
+    def __add__(self, other):
+        return self.merge(other)
+
+    def update(self, other):
+        """Adds the counts of another TextStats object to this one in place."""
+        self.doc_count += other.doc_count
+        self.word_count += other.word_count
+        for name in TextStats.COUNTERS:
+            getattr(self, name).update(getattr(other, name))
+        return self
+
+    def merge(self, other):
+        """Returns a new TextStats object combining this one with another."""
+        return TextStats().update(self).update(other)
+
+    @staticmethod
+    def reduce(stats):
+        """Combines an iterable of TextStats objects into a single TextStats
+        object, accumulating in place rather than merging pairwise."""
+        result = TextStats()
+        for s in stats:
+            result.update(s)
+        return result
+
+    def top_words(self, up_to=10):
+        """Returns the up_to most frequent words as (word, count) pairs."""
+        return word_freq(self.words, up_to=up_to)
+
+    @property
+    def best_date(self):
+        return best_date_str(sorted(self.dates.elements()))
+
 
 class TextProc:
-    def __init__(self, text, **kwargs):
+    """Extracts words, numbers, telephone numbers, email addresses and dates
+    from text.  Each feature in TEXTPROC_FEATURES is computed when it is first
+    accessed (computing any features it depends on) and then cached.
+    Features can be computed up front by listing them in features.
+    Stopwords of the specified languages are filtered out of the words."""
+
+    def __init__(self, text, features=None, languages=None, **kwargs):
         self.debug = False
         self.ignore_case = False
-        self.filter = nltk.corpus.stopwords.words("english")
-        self.filter.extend(nltk.corpus.stopwords.words("french"))
-        self.tokens = []
-        self.dates = []
-        self.numbers = []
+        self.filter = stopwords(languages)
         self.word_dist = []
-        self.capitalized_words = []
-        self.uppercase_words = []
-        self.telephone_no = []
-        self.email_address = []
         self.raw_text = copy.copy(text)
-        self.split_text = self.raw_text.split()
-        self.raw_words = self.filter_text(ignore_numbers=True)
-        self.words = [w.lower() for w in self.raw_words]
-        self.word_set = word_freq(self.words, only_words=True)
-        self.tokens = self.filter_text(ignore_numbers=False)
-        self.capitalized_words = get_capitalized_words(self.raw_words)
-        self.uppercase_words = get_uppercase_words(self.raw_words)
-        self.numbers = get_numbers(self.tokens)
-        self.telephone_no = get_telephone_numbers(self.tokens)
-        self.email_address = get_email_addresses(self.tokens)
-        self.get_dates()
-        # filter ISO formatted dates out of the numbers list
-        new_numbers = []
-        for n in self.numbers:
-            ok = True
-            for d in self.dates:
-                ds = d.isoformat(timespec="hours").replace("T00", "")
-                if n == ds:
-                    ok = False
-            if ok:
-                new_numbers.append(n)
-        self.numbers = new_numbers
+        if features is not None:
+            for feature in features:
+                getattr(self, feature)
+
+    def __getattr__(self, name):
+        # only called when name is not already an attribute, i.e. a
+        # feature which has not been computed yet
+        if name not in TEXTPROC_FEATURES:
+            raise AttributeError(
+                "%r object has no attribute %r" % (self.__class__.__name__, name)
+            )
+        value = getattr(self, "_compute_" + name)()
+        setattr(self, name, value)
+        return value
+
+    def _compute_split_text(self):
+        return self.raw_text.split()
+
+    def _compute_clean_lines(self):
+        return [
+            cleanup_date(line, use_space=True) for line in self.raw_text.splitlines()
+        ]
+
+    def _tokenize(self):
+        self.raw_words, self.tokens, self.token_offsets = tokenize(
+            self.raw_text, self.filter
+        )
+
+    def _compute_raw_words(self):
+        self._tokenize()
+        return self.raw_words
+
+    def _compute_words(self):
+        return [w.lower() for w in self.raw_words]
+
+    def _compute_word_counts(self):
+        return Counter(self.words)
+
+    def _compute_word_set(self):
+        return word_freq(self.word_counts, only_words=True)
+
+    def _compute_tokens(self):
+        self._tokenize()
+        return self.tokens
+
+    def _compute_token_offsets(self):
+        self._tokenize()
+        return self.token_offsets
+
+    def _compute_capitalized_words(self):
+        return get_capitalized_words(self.raw_words)
+
+    def _compute_uppercase_words(self):
+        return get_uppercase_words(self.raw_words)
+
+    def _compute_numbers(self):
+        numbers = get_numbers(self.tokens)
+        # filter ISO formatted dates out of the numbers list, dates are only
+        # needed if there are numbers which could be ISO formatted dates
+        if not any(ISO_DATE_RE.fullmatch(n) for n in numbers):
+            return numbers
+        iso_dates = set(iso_date_str(d) for d in self.dates)
+        return [n for n in numbers if n not in iso_dates]
+
+    def _compute_telephone_no(self):
+        return get_telephone_numbers(self.tokens)
+
+    def _compute_email_address(self):
+        return get_email_addresses(self.tokens)
+
+    def _compute_dates(self):
+        return self.get_dates()
 
     def __str__(self):
         s = []
@@ -93,7 +318,7 @@ class TextProc:
                 len(self.numbers),
             )
         )
-        x = word_freq_str(self.words, up_to=5, style="flat")
+        x = word_freq_str(self.word_counts, up_to=5, style="flat")
         s.append("Top 5 words          : %s" % (x))
         x = word_freq_str(self.capitalized_words, up_to=5, style="flat")
         s.append("Top 5 capital words  : %s" % (x))
@@ -109,68 +334,64 @@ class TextProc:
         return "\n".join(s)
 
     def filter_text(self, text=None, ignore_numbers=False):
-        s = []
-        if text is not None:
-            words = text
-        else:
-            words = self.split_text
-        puncs = (*punctuation, "•", "»")
-        for word in words:
-            if len(word) == 1 and word in puncs:
-                continue
-            if len(word) > 0 and word.lower() not in self.filter:
-                w = strip_punc(word, filter_chars="{ } [ ] ( ) | “ ” , • » ! ? * §")
-                if not has_numbers(w):
-                    w = strip_punc(
-                        w, filter_chars=". - : ;", from_right=True, from_left=True
-                    )
-                if not (ignore_numbers and has_numbers(w)):
-                    s.append(w)
-        return s
+        words = text if text is not None else self.split_text
+        return filter_words(words, self.filter, ignore_numbers=ignore_numbers)
 
     @property
     def best_date(self):
-        if len(self.dates) > 0:
-            best = most_popular(
-                self.dates, ignore_outliers=False, ignore_no_winner=False
-            )
-            if best is not None:
-                return best.isoformat(timespec="hours").replace("T00", "")
-            new_dates = [str(d)[:7] for d in self.dates]
-            date_dict = {nd: d for nd, d in zip(new_dates, self.dates)}
-            best = most_popular(new_dates, ignore_outliers=False, ignore_no_winner=True)
-            return date_dict[best].isoformat(timespec="hours").replace("T00", "")
-        return None
-
-    def get_dates(self, preferred_format=None):
-        lines = self.raw_text.splitlines()
-        dates = get_dates_from_text(lines, debug=self.debug)
-        # if no dates are found, try a last ditch effort by feeding lines with
-        # triple-wise words for candidates such as "July 21, 2019"
-        if len(dates) < 4:
-            if self.debug:
-                print(
-                    "Only %d candidate dates found, searching token list" % (len(dates))
-                )
-            for line in self.tokens:
-                line = cleanup_date(line)
-                dates.extend(get_dates_from_text([line], debug=self.debug))
-        if len(dates) < 4:
-            if self.debug:
-                print("Only %d candidate dates found, searching 3-grams" % (len(dates)))
-            for line in lines:
-                line = cleanup_date(line, use_space=True)
-                triples = n_grams(line, 3, as_list=False)
-                if len(triples) > 0:
-                    dates.extend(get_dates_from_text(triples, debug=self.debug))
-        if len(dates) < 4:
-            if self.debug:
-                print("Only %d candidate dates found, searching 2-grams" % (len(dates)))
-            for line in lines:
-                line = cleanup_date(line, use_space=True)
-                pairs = n_grams(line, 2, as_list=False)
-                if len(pairs) > 0:
-                    dates.extend(get_dates_from_text(pairs, debug=self.debug))
+        return best_date_str(self.dates)
+
+    def stats(self):
+        """Returns a TextStats summary of this text."""
+        return TextStats(
+            doc_count=1,
+            word_count=len(self.split_text),
+            words=Counter(self.words),
+            capitalized_words=Counter(self.capitalized_words),
+            uppercase_words=Counter(self.uppercase_words),
+            numbers=Counter(self.numbers),
+            dates=Counter(self.dates),
+        )
+
+    def date_candidates(self, stage):
+        """Generates cleaned candidate date phrases for a search stage.
+        Stages are "lines", "tokens", "3-grams" and "2-grams"."""
+        if stage == "lines":
+            for line in self.raw_text.splitlines():
+                yield cleanup_date(line, use_space=True)
+        elif stage == "tokens":
+            for token in self.tokens:
+                yield cleanup_date(token)
+        else:
+            n = int(stage[0])
+            for line in self.clean_lines:
+                for phrase in n_grams(line, n, as_list=False):
+                    yield phrase
+
+    def get_dates(self, preferred_format=None, min_dates=4, stages=None):
+        """Finds dates in the text by searching candidate phrases in stages:
+        lines, then tokens, then triple-wise and pair-wise words for
+        candidates such as "July 21, 2019".  Later stages are only searched
+        if fewer than min_dates dates have been found.  Each distinct phrase
+        is only parsed once across all stages."""
+        stages = stages if stages is not None else DATE_STAGES
+        parsed = {}
+        dates = []
+        for i, stage in enumerate(stages):
+            if i > 0:
+                if len(dates) >= min_dates:
+                    break
+                if self.debug:
+                    print(
+                        "Only %d candidate dates found, searching %s"
+                        % (len(dates), stage)
+                    )
+            for phrase in self.date_candidates(stage):
+                if phrase not in parsed:
+                    parsed[phrase] = get_dates_from_text(
+                        [phrase], debug=self.debug, cleaned=True
+                    )
+                dates.extend(parsed[phrase])
         if preferred_format is not None:
             return sorted(dates)
         self.dates = sorted(dates)
@@ -180,3 +401,116 @@ class TextProc:
                     "%d. %s" % (i + 1, d.isoformat(timespec="hours").replace("T00", ""))
                 )
         return self.dates
+
+
+class TextProcStream:
+    """Streaming counterpart of TextProc for large documents.  Text is
+    consumed line by line from any iterable of lines such as a file object
+    and only running counts of words, capitalized/uppercase words, numbers,
+    telephone numbers, email addresses and dates are kept.  If max_items is
+    specified, each counter is pruned to its max_items most common entries
+    whenever it grows beyond twice that size."""
+
+    def __init__(
+        self, lines=None, languages=None, date_stages=("lines",), max_items=None
+    ):
+        self.filter = stopwords(languages)
+        self.date_stages = date_stages
+        self.max_items = max_items
+        self.line_count = 0
+        self.word_count = 0
+        self.words = Counter()
+        self.capitalized_words = Counter()
+        self.uppercase_words = Counter()
+        self.numbers = Counter()
+        self.telephone_no = Counter()
+        self.email_address = Counter()
+        self.dates = Counter()
+        if lines is not None:
+            self.update(lines)
+
+    def __str__(self):
+        return (
+            "Lines: %-5d Word count: %-5d Unique word count: %-5d Dates found: %d"
+            % (
+                self.line_count,
+                self.word_count,
+                len(self.words),
+                sum(self.dates.values()),
+            )
+        )
+
+    @property
+    def counters(self):
+        return (
+            self.words,
+            self.capitalized_words,
+            self.uppercase_words,
+            self.numbers,
+            self.telephone_no,
+            self.email_address,
+            self.dates,
+        )
+
+    def update(self, lines):
+        """Updates the counts from an iterable of lines or a string."""
+        if isinstance(lines, str):
+            lines = lines.splitlines()
+        for line in lines:
+            self.update_line(line)
+        return self
+
+    def update_line(self, line):
+        """Updates the counts from a single line of text."""
+        split_text = line.split()
+        self.line_count += 1
+        self.word_count += len(split_text)
+        raw_words, tokens, _ = tokenize(line, self.filter)
+        self.words.update(w.lower() for w in raw_words)
+        self.capitalized_words.update(get_capitalized_words(raw_words))
+        self.uppercase_words.update(get_uppercase_words(raw_words))
+        self.telephone_no.update(get_telephone_numbers(tokens))
+        self.email_address.update(get_email_addresses(tokens))
+        dates = self.line_dates(line, tokens)
+        self.dates.update(dates)
+        # filter ISO formatted dates out of the numbers
+        iso_dates = set(iso_date_str(d) for d in dates)
+        self.numbers.update(n for n in get_numbers(tokens) if n not in iso_dates)
+        if self.max_items is not None:
+            for counter in self.counters:
+                if len(counter) > 2 * self.max_items:
+                    kept = counter.most_common(self.max_items)
+                    counter.clear()
+                    counter.update(dict(kept))
+
+    def line_dates(self, line, tokens):
+        """Finds dates in a line by searching each of the date_stages in turn
+        until a date is found."""
+        clean_line = cleanup_date(line, use_space=True)
+        for stage in self.date_stages:
+            if stage == "lines":
+                phrases = [clean_line]
+            elif stage == "tokens":
+                phrases = [cleanup_date(token) for token in tokens]
+            else:
+                phrases = n_grams(clean_line, int(stage[0]), as_list=False)
+            dates = get_dates_from_text(phrases, cleaned=True)
+            if len(dates) > 0:
+                return dates
+        return []
+
+    @property
+    def best_date(self):
+        return best_date_str(sorted(self.dates.elements()))
+
+    def stats(self):
+        """Returns a TextStats summary of the text processed so far."""
+        return TextStats(
+            doc_count=1,
+            word_count=self.word_count,
+            words=self.words,
+            capitalized_words=self.capitalized_words,
+            uppercase_words=self.uppercase_words,
+            numbers=self.numbers,
+            dates=self.dates,
+        )